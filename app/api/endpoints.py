@@ -1,180 +1,372 @@
 
-import os
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import StreamingResponse
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import asyncio
+import logging
+import tempfile
+import time
+from fastapi import APIRouter, File, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from app.api.schemas import AgentInput, IngestInput
-from app.graph.nodes import get_vector_store
+from app.api.streaming import MEDIA_TYPES, encode_stream, negotiate, replay, source_ids, stream_stats
+from app.graph.nodes import get_vector_store, retrieve_portfolio
 from app.graph.workflow import app_graph
 from app.core.limiter import limiter
+from app.core.config import Config
+from app.core.factory import clients, get_embeddings
 from app.core.semantic_cache import semantic_cache
+from app.core.milvus_executor import milvus_executor
+from app.core.task_queue import task_queue
+from app.core.single_flight import single_flight
+from app.core.utils import count_tokens, normalize_question
+from app.core.corpus import corpus_state
+from app.core.local_vector_store import LocalVectorStore
+from app.core.ingestion import collect_pdf_files
+from app.core.ingestion_jobs import ingestion_jobs
+from app.core.parse_cache import parse_cache
+from app.core.lexical_index import lexical_index
+from app.core.reranker import reranker
+from app.core.profile_summary import profile_summary
+from app.core.metrics import LLM_FIRST_TOKEN_SECONDS, LLM_TOKENS_PER_SECOND, metrics
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+
+def _is_first_turn(recent_messages, message: str) -> bool:
+    """
+    Whether the client's message window carries no earlier exchange. The web
+    UI pushes the current question into its window before posting, so a
+    window holding only that user turn still counts as context-free.
+    """
+    question = normalize_question(message)
+    return all(
+        entry.get("role") == "user" and normalize_question(entry.get("content") or "") == question
+        for entry in recent_messages or []
+    )
+
 @router.post("/agent")
 @limiter.limit("10/minute")
 async def run_agent(request: Request, input_data: AgentInput):
     """
     Runs the RAG agent to answer a question with streaming and conversation memory.
+    Streams plain text by default; `Accept: text/event-stream` (SSE) or
+    `application/x-ndjson` selects typed meta / token / done / error events.
     Rate Limit: 10 requests per minute.
     """
     import uuid
     from app.core.conversation_memory import conversation_memory
     
+    started = time.perf_counter()
+    stream_format = negotiate(request.headers.get("accept"))
     # Generate session ID if not provided
     session_id = input_data.session_id or str(uuid.uuid4())
+    # Answers are cached against the corpus version they were generated from
+    corpus_version = corpus_state.version
+
+    def replay_cached(text):
+        # Plain text clients get the whole answer at once; pacing only
+        # applies to typed streams and is off unless configured
+        return replay(text, interval_ms=0 if stream_format == "text" else None)
+
+    def respond(chunks, coalesce_tokens=True, **meta):
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} if stream_format == "sse" else None
+        meta = {"session_id": session_id, "corpus_version": corpus_version, **meta}
+        return StreamingResponse(
+            encode_stream(stream_format, chunks, meta, started, coalesce_tokens),
+            media_type=MEDIA_TYPES[stream_format],
+            headers=headers
+        )
     
-    # 1. Semantic Cache Check
-    cached_answer = await semantic_cache.search(input_data.message)
+    # 0. Exact-match L1 cache, checked before paying for an embedding
+    cached_answer = semantic_cache.search_exact(input_data.message)
     if cached_answer:
-        # Return as a simple stream for consistency
-        async def mock_stream():
+        return respond(replay_cached(cached_answer), coalesce_tokens=False, cache="l1")
+
+    async def answer(context_free: bool):
+        """
+        Yields the answer's meta fields as a dict, then its text: a cached
+        answer in one chunk, or the LLM's tokens.
+
+        Args:
+            context_free: The question has no session context, so conversation
+                memory is skipped and the answer may be shared across sessions
+        """
+        # Embed the question once; cache, memory and retrieval all search by vector.
+        # If the provider fails, answer uncached rather than failing the request.
+        try:
+            question_embedding = await get_embeddings().aembed_query(input_data.message)
+        except Exception as e:
+            logger.warning("Question embedding failed, skipping the semantic cache: %s", e)
+            question_embedding = None
+
+        # 1-2. Semantic cache check, conversation context and portfolio retrieval
+        # run concurrently; retrieval is speculative and dropped on a cache hit.
+        cache_task = None
+        if question_embedding is not None:
+            cache_task = asyncio.create_task(
+                semantic_cache.search(input_data.message, vector=question_embedding)
+            )
+        memory_task = None
+        if not context_free:
+            memory_task = asyncio.create_task(
+                conversation_memory.retrieve_relevant_context(
+                    query=input_data.message,
+                    session_id=session_id,
+                    k=3,
+                    embedding=question_embedding
+                )
+            )
+        timings = {}
+        retrieval_started = time.perf_counter()
+        retrieval_task = asyncio.create_task(
+            retrieve_portfolio(input_data.message, question_embedding)
+        )
+        retrieval_task.add_done_callback(
+            lambda _: timings.setdefault("retrieve_ms", round((time.perf_counter() - retrieval_started) * 1000, 3))
+        )
+        pending = [task for task in (memory_task, retrieval_task) if task is not None]
+
+        cached_answer = await cache_task if cache_task is not None else None
+        if cached_answer:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            yield {"cache": "l2"}
             yield cached_answer
-        return StreamingResponse(mock_stream(), media_type="text/plain")
+            return
 
-    # 2. Retrieve conversation context from Milvus
-    conversation_context = await conversation_memory.retrieve_relevant_context(
-        query=input_data.message,
-        session_id=session_id,
-        k=3
-    )
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        portfolio_context = results[-1]
+        conversation_context = results[0] if memory_task is not None else []
+        if isinstance(conversation_context, Exception):
+            conversation_context = []
+        if isinstance(portfolio_context, Exception):
+            # Leave it to the graph's retrieve node to retry and surface the error
+            logger.warning("Speculative retrieval failed: %s", portfolio_context)
+            portfolio_context = []
 
-    # 3. Run Agent with Streaming
-    async def event_generator():
-        full_answer = ""
+        # 3. Run Agent with Streaming
         initial_state = {
             "question": input_data.message,
-            "context": [],
+            "context": portfolio_context,
             "answer": "",
             "session_id": session_id,
             "conversation_context": conversation_context,
-            "recent_messages": input_data.recent_messages or []
+            "recent_messages": input_data.recent_messages or [],
+            "question_embedding": question_embedding,
+            "timings": timings
         }
-        
-        try:
-            # Stream tokens from the graph
-            async for event in app_graph.astream_events(initial_state, version="v1"):
-                kind = event["event"]
-                
-                # Check for LLM stream events
-                if kind == "on_chat_model_stream":
-                    content = event["data"]["chunk"].content
-                    if content:
-                        full_answer += content
-                        yield content
-                        
-            # 4. Save to Cache (After stream completes)
-            if full_answer:
-                await semantic_cache.add(input_data.message, full_answer)
-                
-            # 5. Store conversation summary if we have enough messages
-            recent_messages = input_data.recent_messages or []
-            if len(recent_messages) >= 4:  # Every 2 exchanges (4 messages)
-                await conversation_memory.store_summary(
-                    session_id=session_id,
-                    messages=recent_messages
+
+        full_answer = ""
+        generation_started = time.perf_counter()
+        first_token_at = None
+        # Only the generate node's LLM tokens plus each node's state update
+        # (for its stage timings), rather than an event for every runnable
+        async for mode, payload in app_graph.astream(initial_state, stream_mode=["messages", "updates"]):
+            if mode == "messages":
+                chunk, metadata = payload
+                if metadata.get("langgraph_node") == "generate" and chunk.content:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        LLM_FIRST_TOKEN_SECONDS.observe(first_token_at - generation_started)
+                    full_answer += chunk.content
+                    yield chunk.content
+            else:
+                for node, update in payload.items():
+                    timings.update((update or {}).get("timings") or {})
+                    # Generation starts once the nodes before it have finished
+                    if node != "generate":
+                        generation_started = time.perf_counter()
+                    if node == "pack":
+                        # The context generate sees, after rerank and packing
+                        yield {
+                            "cache": None,
+                            "retrieve_ms": timings.get("retrieve_ms"),
+                            "sources": source_ids(update["context"]),
+                            "conversation_summaries": len(update["conversation_context"]),
+                            "timings": timings,
+                        }
+
+        if first_token_at is not None:
+            streaming_seconds = time.perf_counter() - first_token_at
+            if streaming_seconds > 0:
+                LLM_TOKENS_PER_SECOND.observe(count_tokens(full_answer) / streaming_seconds)
+
+        # 4. Save to Cache (After stream completes, off the response path)
+        if full_answer:
+            task_queue.enqueue(
+                "semantic_cache.add",
+                lambda: semantic_cache.add(
+                    input_data.message,
+                    full_answer,
+                    vector=question_embedding,
+                    corpus_version=corpus_version
                 )
-                
-        except Exception as e:
-            print(f"Streaming error: {e}")
-            yield f"Error: {str(e)}"
+            )
+
+    async def remember(items):
+        """Passes this request's answer through, then folds the exchange into its session."""
+        generated = False
+        full_answer = ""
+        async for item in items:
+            if isinstance(item, dict):
+                generated = item.get("cache") is None
+                yield item
+            elif generated:
+                full_answer += item
+                yield item
+            else:
+                async for piece in replay_cached(item):
+                    yield piece
+        if not generated:
+            return
 
-    return StreamingResponse(event_generator(), media_type="text/plain")
+        # 5. Fold this exchange into the session's rolling summary; messages
+        # already folded are skipped, so the LLM only runs when enough are new
+        # (the client's window may already hold the current question)
+        conversation = (input_data.recent_messages or []) + [
+            {"role": "user", "content": input_data.message},
+            {"role": "assistant", "content": full_answer},
+        ]
+        task_queue.enqueue(
+            "conversation_memory.store_summary",
+            lambda: conversation_memory.store_summary(
+                session_id=session_id,
+                messages=conversation
+            )
+        )
+
+    # Questions without session context get the same answer, so identical
+    # in-flight ones against the same corpus share a single generation. The
+    # flight is joined before any embedding, cache or retrieval work, so
+    # followers skip all of it.
+    # A generated session id is new, so it has no stored memory to check.
+    context_free = _is_first_turn(input_data.recent_messages, input_data.message) and not (
+        input_data.session_id and await conversation_memory.has_memory(session_id)
+    )
+    if context_free:
+        key = f"{corpus_version}:{normalize_question(input_data.message)}"
+        items = single_flight.stream(key, lambda: answer(context_free=True))
+    else:
+        items = answer(context_free=False)
+    return respond(remember(items))
 
-@router.post("/ingest")
+@router.post("/ingest", status_code=202)
 @limiter.limit("5/minute")
 async def ingest_document(request: Request, input_data: IngestInput):
     """
-    Ingests a PDF file into Milvus.
+    Starts a background job that ingests PDF files into Milvus.
+    Poll the returned status_url for progress.
     Rate Limit: 5 requests per minute.
     """
-    file_path = input_data.file_path
-    directories = input_data.directories
-    
-    pdf_files = []
-    
-    # 1. Collect files from direct path
-    if file_path and os.path.exists(file_path):
-        pdf_files.append(file_path)
-        
-    # 2. Collect files from directories
-    for directory in directories:
-        if os.path.exists(directory):
-            for root, _, files in os.walk(directory):
-                for file in files:
-                    if file.lower().endswith(".pdf"):
-                        pdf_files.append(os.path.join(root, file))
+    pdf_files = collect_pdf_files(input_data.file_path, input_data.directories)
     
     if not pdf_files:
         raise HTTPException(status_code=404, detail="No PDF files found in provided paths")
         
-    try:
-        all_splits = []
-        
-        for pdf_path in pdf_files:
-            loader = PyPDFLoader(pdf_path)
-            docs = loader.load()
-            
-            text_splitters = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-            splits = text_splitters.split_documents(docs)
-            
-            # Ensure metadata
-            for split in splits:
-                split.metadata.setdefault("keywords", "portfolio")
-                split.metadata.setdefault("source", pdf_path)
-                # ... (keep other defaults if strict schema needed, relying on Milvus auto-fill / None otherwise if flexible)
-                # Minimal defaults to ensure insertion
-                for field in ["producer", "creator", "creationdate", "author", "moddate", "subject", "title", "trapped", "page_label"]:
-                    split.metadata.setdefault(field, "")
-                split.metadata.setdefault("total_pages", 0)
-                split.metadata.setdefault("page", 0)
-
-            all_splits.extend(splits)
-        
-        vector_store = get_vector_store()
-        if not vector_store:
-             raise HTTPException(status_code=500, detail="Vector store not configured")
-        
-        if all_splits:
-            vector_store.add_documents(all_splits)
-            
-        return {
-            "message": f"Successfully processed {len(pdf_files)} files.",
-            "total_chunks": len(all_splits),
-            "files": pdf_files
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Unchanged files are detected by hash and skipped; only new or changed
+    # chunks are embedded and inserted.
+    job = ingestion_jobs.submit(pdf_files, scan_roots=input_data.directories)
+    return {
+        "message": f"Ingestion of {len(pdf_files)} files started.",
+        "job_id": job.id,
+        "status_url": str(request.url_for("get_ingest_job", job_id=job.id)),
+        "files": pdf_files
+    }
 
-@router.get("/summary")
+@router.post("/ingest/upload", status_code=202)
 @limiter.limit("5/minute")
-async def get_profile_summary(request: Request):
+async def ingest_upload(request: Request, file: UploadFile = File(...)):
     """
-    Generates a brief professional summary based on ingested documents.
+    Starts a background job that ingests an uploaded PDF.
+    Pages are parsed, embedded and inserted in batches as they stream through.
     Rate Limit: 5 requests per minute.
     """
+    if not (file.filename or "").lower().endswith(".pdf"):
+        raise HTTPException(status_code=415, detail="Only PDF uploads are supported")
+
+    # The upload is closed when this request ends, so hand the job its own
+    # spooled copy (in memory up to UPLOAD_SPOOL_BYTES)
+    buffer = tempfile.SpooledTemporaryFile(max_size=Config.UPLOAD_SPOOL_BYTES)
+    size = 0
+    while chunk := await file.read(1024 * 1024):
+        size += len(chunk)
+        if size > Config.UPLOAD_MAX_BYTES:
+            buffer.close()
+            raise HTTPException(status_code=413, detail="Upload exceeds UPLOAD_MAX_BYTES")
+        buffer.write(chunk)
+    buffer.seek(0)
+    if buffer.read(5) != b"%PDF-":
+        buffer.close()
+        raise HTTPException(status_code=415, detail="Uploaded file is not a PDF")
+    buffer.seek(0)
+
+    source = f"upload://{file.filename}"
+    job = ingestion_jobs.submit_stream(buffer, source)
+    return {
+        "message": f"Ingestion of {file.filename} started.",
+        "job_id": job.id,
+        "status_url": str(request.url_for("get_ingest_job", job_id=job.id)),
+        "files": [source]
+    }
+
+@router.get("/ingest/{job_id}")
+@limiter.limit("60/minute")
+async def get_ingest_job(request: Request, job_id: str):
+    """
+    Returns status, per-file progress and throughput of an ingestion job.
+    Rate Limit: 60 requests per minute.
+    """
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingestion job")
+    return job.as_dict()
+
+@router.delete("/ingest/{job_id}")
+@limiter.limit("10/minute")
+async def cancel_ingest_job(request: Request, job_id: str):
+    """
+    Cancels a running ingestion job.
+    Rate Limit: 10 requests per minute.
+    """
+    job = ingestion_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingestion job")
+    return {"job_id": job.id, "status": job.status if job.finished else "cancelling"}
+
+@router.get("/summary")
+@limiter.limit("60/minute")
+async def get_profile_summary(request: Request):
+    """
+    Returns a brief professional summary based on ingested documents.
+    The summary is generated once per corpus version and served from memory
+    with an ETag; ingesting new documents regenerates it in the background.
+    Rate Limit: 60 requests per minute.
+    """
     try:
-        # Check if we have any data first
-        vector_store = get_vector_store()
-        if not vector_store:
-             return {"summary": "No profile data available. Please ingest your resume."}
-             
-        # We can simply ask the agent to summarize
-        prompt = "Summarize the professional profile of this candidate in 3-4 concise sentences, highlighting key skills and roles. Write it in the first person (e.g., 'I am a...')."
-        
-        initial_state = {"question": prompt, "context": [], "answer": ""}
-        final_state = await app_graph.ainvoke(initial_state)
-        
-        # If no documents are found, the agent might hallucinate or say I don't know. 
-        # Ideally we'd check if context was retrieved, but for now we rely on the agent's response.
-        return {"summary": final_state["answer"]}
+        if profile_summary.summary is None:
+            # Check if we have any data first
+            vector_store = await milvus_executor.run(get_vector_store)
+            if not vector_store:
+                return {"summary": "No profile data available. Please ingest your resume."}
+            # First request ever: generate inline (concurrent callers share it)
+            await profile_summary.refresh()
+        elif not profile_summary.is_current:
+            # Serve the previous summary while the new one is generated
+            task_queue.enqueue("profile_summary.refresh", profile_summary.refresh)
+
+        headers = {
+            "ETag": profile_summary.etag,
+            "Cache-Control": f"public, max-age={Config.SUMMARY_MAX_AGE_SECONDS}"
+        }
+        if request.headers.get("if-none-match") == profile_summary.etag:
+            return Response(status_code=304, headers=headers)
+        return JSONResponse({"summary": profile_summary.summary}, headers=headers)
         
     except Exception as e:
         # Fail gracefully so the UI doesn't break
-        print(f"Error generating summary: {e}")
+        logger.error("Error generating summary: %s", e)
         return {"summary": "Welcome to my portfolio! Ask me anything about my experience."}
         
 @router.get("/schema")
@@ -185,9 +377,12 @@ async def inspect_schema(request: Request):
     Returns the schema of the Milvus collection to identify missing fields.
     """
     try:
-        vector_store = get_vector_store()
+        vector_store = await milvus_executor.run(get_vector_store)
         if not vector_store:
             return {"error": "Vector store not connected"}
+
+        if isinstance(vector_store, LocalVectorStore):
+            return {"schema": vector_store.schema()}
         
         # Access the underlying collection
         # langchain_milvus.Milvus stores the collection object in .col or we can get it via utility
@@ -196,7 +391,7 @@ async def inspect_schema(request: Request):
         # Safe way using utility if we had the connection alias, but langchain manages its own.
         # Let's try to get it from the vector_store object.
         
-        col = vector_store.col
+        col = await milvus_executor.run(lambda: vector_store.col)
         if not col:
             return {"error": "Could not access collection object"}
             
@@ -213,3 +408,37 @@ async def inspect_schema(request: Request):
         
     except Exception as e:
         return {"error": str(e)}
+
+@router.get("/metrics")
+@limiter.limit("60/minute")
+async def get_metrics(request: Request):
+    """
+    Returns latency histograms, cache counters and queue gauges in the
+    Prometheus text exposition format.
+    Rate Limit: 60 requests per minute.
+    """
+    return Response(content=metrics.render(), media_type=metrics.content_type)
+
+@router.get("/stats")
+@limiter.limit("10/minute")
+async def get_stats(request: Request):
+    """
+    Returns runtime statistics for the shared clients.
+    Rate Limit: 10 requests per minute.
+    """
+    from app.core.conversation_memory import conversation_memory
+
+    return {
+        "clients": clients.stats(),
+        "milvus_executor": milvus_executor.stats(),
+        "task_queue": task_queue.stats(),
+        "single_flight": single_flight.stats(),
+        "answer_cache": semantic_cache.stats(),
+        "ingestion_jobs": ingestion_jobs.stats(),
+        "parse_cache": parse_cache.stats(),
+        "lexical_index": lexical_index.stats(),
+        "reranker": reranker.stats(),
+        "profile_summary": profile_summary.stats(),
+        "conversation_memory": conversation_memory.stats(),
+        "streaming": stream_stats.stats(),
+    }
@@ -0,0 +1,332 @@
+
+import asyncio
+import json
+import logging
+import re
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from app.core.config import Config
+from app.core.metrics import AGENT_SECONDS
+from app.core.utils import count_tokens
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    "text": "text/plain",
+    "sse": "text/event-stream",
+    "ndjson": "application/x-ndjson",
+}
+
+# Splits after whitespace so re-chunked text keeps its spacing
+_PIECES = re.compile(r"\S+\s*|\s+")
+
+
+def negotiate(accept: str) -> str:
+    """
+    Picks the /agent stream format from the Accept header. Anything other
+    than an explicit SSE or NDJSON request gets the original plain text.
+    """
+    accept = (accept or "").lower()
+    if "text/event-stream" in accept:
+        return "sse"
+    if "application/x-ndjson" in accept or "application/ndjson" in accept:
+        return "ndjson"
+    return "text"
+
+
+def source_ids(docs: List[Document]) -> List[Dict]:
+    """Distinct (source, page) pairs of the retrieved chunks, in rank order."""
+    seen = []
+    for doc in docs:
+        ref = {"source": doc.metadata.get("source"), "page": doc.metadata.get("page")}
+        if ref["source"] is not None and ref not in seen:
+            seen.append(ref)
+    return seen
+
+
+async def replay(text: str, chunk_chars: int = None, interval_ms: float = None) -> AsyncIterator[str]:
+    """
+    Streams a cached answer. With no interval (the default) it goes out as a
+    single write; otherwise it is re-chunked into word-aligned pieces of
+    about `chunk_chars`, paced `interval_ms` apart, like a generation.
+    """
+    chunk_chars = chunk_chars or Config.STREAM_REPLAY_CHUNK_CHARS
+    interval = (Config.STREAM_REPLAY_INTERVAL_MS if interval_ms is None else interval_ms) / 1000
+    if interval <= 0:
+        if text:
+            yield text
+        return
+    chunk = ""
+    first = True
+    for piece in _PIECES.findall(text):
+        chunk += piece
+        if len(chunk) >= chunk_chars:
+            if not first and interval:
+                await asyncio.sleep(interval)
+            yield chunk
+            chunk = ""
+            first = False
+    if chunk:
+        if not first and interval:
+            await asyncio.sleep(interval)
+        yield chunk
+
+
+class StreamMetrics:
+    """Per-request counters of one answer stream."""
+
+    def __init__(self):
+        self.tokens = 0
+        self.writes = 0
+        self.bytes = 0
+        self.wait_ms = 0.0
+
+    def as_dict(self, total_ms: float):
+        return {
+            "llm_chunks": self.tokens,
+            "writes": self.writes,
+            "bytes": self.bytes,
+            # Time not spent waiting for upstream tokens: coalescing, encoding, writes
+            "overhead_ms": round(max(total_ms - self.wait_ms, 0.0), 3),
+        }
+
+
+class StreamStats:
+    """Aggregate /agent stream counters for /stats."""
+
+    def __init__(self):
+        self.streams = 0
+        self.errors = 0
+        self.tokens = 0
+        self.writes = 0
+        self.bytes = 0
+        self.total_overhead_ms = 0.0
+
+    def record(self, metrics: Dict, error: bool = False):
+        self.streams += 1
+        self.errors += int(error)
+        self.tokens += metrics["llm_chunks"]
+        self.writes += metrics["writes"]
+        self.bytes += metrics["bytes"]
+        self.total_overhead_ms += metrics["overhead_ms"]
+
+    def stats(self):
+        return {
+            "streams": self.streams,
+            "errors": self.errors,
+            "flush_ms": Config.STREAM_FLUSH_MS,
+            "flush_bytes": Config.STREAM_FLUSH_BYTES,
+            "llm_chunks_per_write": round(self.tokens / self.writes, 3) if self.writes else 0.0,
+            "avg_writes": round(self.writes / self.streams, 3) if self.streams else 0.0,
+            "avg_bytes": round(self.bytes / self.streams, 3) if self.streams else 0.0,
+            "avg_overhead_ms": round(self.total_overhead_ms / self.streams, 3) if self.streams else 0.0,
+        }
+
+
+_END = object()
+
+
+async def coalesce(
+    tokens: AsyncIterator[str],
+    metrics: StreamMetrics,
+    flush_ms: float = None,
+    flush_bytes: int = None,
+) -> AsyncIterator[str]:
+    """
+    Joins LLM token deltas into larger chunks. The first token goes out at
+    once; after that the buffer is flushed when it reaches `flush_bytes` or
+    `flush_ms` after its first token, whichever comes first, so a pause in
+    generation never holds text back longer than `flush_ms`.
+
+    The upstream is drained by its own task, so the time budget is enforced
+    even while no token is arriving. With either limit at 0 every token is
+    passed straight through.
+    """
+    flush_ms = Config.STREAM_FLUSH_MS if flush_ms is None else flush_ms
+    flush_bytes = Config.STREAM_FLUSH_BYTES if flush_bytes is None else flush_bytes
+    if flush_ms <= 0 or flush_bytes <= 0:
+        iterator = tokens.__aiter__()
+        while True:
+            waited = time.perf_counter()
+            try:
+                token = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                metrics.wait_ms += (time.perf_counter() - waited) * 1000
+            metrics.tokens += 1
+            yield token
+
+    queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for token in tokens:
+                queue.put_nowait(token)
+            queue.put_nowait(_END)
+        except Exception as e:
+            queue.put_nowait(e)
+
+    loop = asyncio.get_running_loop()
+    producer = asyncio.create_task(pump())
+    buffer: List[str] = []
+    size = 0
+    deadline: Optional[float] = None
+    first = True
+    try:
+        while True:
+            waited = time.perf_counter()
+            try:
+                if buffer:
+                    item = await asyncio.wait_for(queue.get(), max(deadline - loop.time(), 0))
+                else:
+                    item = await queue.get()
+            except asyncio.TimeoutError:
+                item = None
+            metrics.wait_ms += (time.perf_counter() - waited) * 1000
+
+            if isinstance(item, str):
+                metrics.tokens += 1
+                if not buffer:
+                    deadline = loop.time() + flush_ms / 1000
+                buffer.append(item)
+                size += len(item.encode("utf-8"))
+                if not first and size < flush_bytes:
+                    continue
+                first = False
+            if buffer:
+                chunk = "".join(buffer)
+                buffer, size = [], 0
+                yield chunk
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+    finally:
+        producer.cancel()
+
+
+def _encode(fmt: str, event: str, data: Dict) -> str:
+    if fmt == "sse":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, **data}) + "\n"
+
+
+async def encode_stream(
+    fmt: str,
+    chunks: AsyncIterator,
+    meta: Dict,
+    started: float,
+    coalesce_tokens: bool = True,
+    timings: Dict = None,
+) -> AsyncIterator[str]:
+    """
+    Wraps an answer's chunk stream in the negotiated format.
+
+    Plain text yields the chunks as they are (errors inlined as "Error: ...").
+    SSE / NDJSON emit a `meta` event up front, one `token` event per chunk,
+    then `done` with token counts, latencies and stream overhead, or `error`
+    on failure.
+
+    The stream may start with a dict of meta fields only known once the
+    answer is under way (cache tier, sources, ...); `meta` is sent after it.
+    Its `timings` entry, if any, replaces `timings`. Cached answers
+    (meta `cache` set) are never coalesced.
+
+    Args:
+        fmt: 'text', 'sse' or 'ndjson' (see negotiate)
+        chunks: Answer chunks, optionally led by a dict of meta fields
+        meta: Fields of the `meta` event (cache tier, retrieval latency, sources, ...)
+        started: perf_counter() at the start of the request
+        coalesce_tokens: Whether to coalesce LLM token deltas (see coalesce)
+        timings: Per-stage latencies added to `done`, filled in while streaming
+    """
+    structured = fmt != "text"
+    metrics = StreamMetrics()
+    stream_started = time.perf_counter()
+    finished = False
+
+    def finish(outcome: str):
+        nonlocal finished
+        finished = True
+        result = metrics.as_dict((time.perf_counter() - stream_started) * 1000)
+        stream_stats.record(result, error=outcome == "error")
+        AGENT_SECONDS.observe(time.perf_counter() - started, cache=meta.get("cache") or "none", outcome=outcome)
+        return result
+
+    items = chunks.__aiter__()
+    head = None
+    head_error = None
+    try:
+        head = await items.__anext__()
+    except StopAsyncIteration:
+        head = _END
+    except Exception as e:
+        head_error = e
+    except BaseException:
+        # Client went away before the answer started
+        finish("cancelled")
+        raise
+    finally:
+        metrics.wait_ms += (time.perf_counter() - stream_started) * 1000
+    if isinstance(head, dict):
+        meta = {**meta, **head}
+        timings = meta.pop("timings", timings)
+        head = None
+
+    async def rest():
+        if head_error is not None:
+            raise head_error
+        if head is _END:
+            return
+        if head is not None:
+            yield head
+        async for item in items:
+            yield item
+
+    # Pre-chunked streams (cached answer replays) pass straight through
+    coalesce_tokens = coalesce_tokens and not meta.get("cache")
+    chunks = coalesce(rest(), metrics) if coalesce_tokens else coalesce(rest(), metrics, flush_ms=0)
+
+    if structured:
+        yield _encode(fmt, "meta", meta)
+
+    answer = []
+    first_token_ms = None
+    try:
+        try:
+            async for chunk in chunks:
+                if first_token_ms is None:
+                    first_token_ms = round((time.perf_counter() - started) * 1000, 3)
+                answer.append(chunk)
+                data = _encode(fmt, "token", {"text": chunk}) if structured else chunk
+                metrics.writes += 1
+                metrics.bytes += len(data.encode("utf-8"))
+                yield data
+        except Exception as e:
+            logger.error("Streaming error: %s", e)
+            finish("error")
+            yield _encode(fmt, "error", {"message": str(e)}) if structured else f"Error: {str(e)}"
+            return
+
+        stream = finish("ok")
+        if structured:
+            yield _encode(fmt, "done", {
+                "chunks": len(answer),
+                "answer_tokens": count_tokens("".join(answer)),
+                "first_token_ms": first_token_ms,
+                "total_ms": round((time.perf_counter() - started) * 1000, 3),
+                "timings": dict(timings or {}),
+                "stream": stream,
+            })
+    finally:
+        # Client went away mid-stream
+        if not finished:
+            finish("cancelled")
+
+
+# Global instance
+stream_stats = StreamStats()
@@ -1,7 +1,10 @@
 
+import logging
 import os
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -18,6 +21,115 @@ class Config:
     MILVUS_URI = os.getenv("MILVUS_URI")
     MILVUS_TOKEN = os.getenv("MILVUS_TOKEN")
     COLLECTION_NAME = os.getenv("MILVUS_COLLECTION", "portfolio_rag")
+    # Vector store backend: 'milvus' (Zilliz Cloud) or 'local' (in-process NumPy index)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "milvus").lower()
+    LOCAL_VECTOR_DTYPE = os.getenv("LOCAL_VECTOR_DTYPE", "float32")  # or 'float16'
+    LOCAL_VECTOR_PERSIST_INTERVAL = float(os.getenv("LOCAL_VECTOR_PERSIST_INTERVAL", "5"))
+
+    # Threads available for blocking Milvus calls (keeps them off the event loop)
+    MILVUS_POOL_SIZE = int(os.getenv("MILVUS_POOL_SIZE", "8"))
+
+    # Shared HTTP connection pool for LLM / embedding clients
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+
+    # Local state (embedding cache, etc.)
+    CACHE_DIR = os.getenv("RAGUME_CACHE_DIR", ".cache")
+
+    # Embedding Cache Settings
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+    # Memory budget of the in-process tier (float32 vectors, ~6 KB each at 1536 dims)
+    EMBEDDING_CACHE_MEMORY_MB = float(os.getenv("EMBEDDING_CACHE_MEMORY_MB", "32"))
+
+    # Embedding micro-batching (concurrent calls merged into one provider request)
+    EMBEDDING_BATCH_ENABLED = os.getenv("EMBEDDING_BATCH_ENABLED", "true").lower() == "true"
+    EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+    EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "8"))
+
+    # Answer Cache L1 (exact match on normalized question, in process)
+    ANSWER_CACHE_L1_SIZE = int(os.getenv("ANSWER_CACHE_L1_SIZE", "1000"))
+    ANSWER_CACHE_L1_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_L1_TTL_SECONDS", "3600"))
+
+    # Semantic Cache (L2) expiry
+    SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    SEMANTIC_CACHE_SWEEP_INTERVAL_SECONDS = float(os.getenv("SEMANTIC_CACHE_SWEEP_INTERVAL_SECONDS", "3600"))
+    SEMANTIC_CACHE_SWEEP_BATCH = int(os.getenv("SEMANTIC_CACHE_SWEEP_BATCH", "500"))
+    SEMANTIC_CACHE_SWEEP_MAX_BATCHES = int(os.getenv("SEMANTIC_CACHE_SWEEP_MAX_BATCHES", "100"))
+
+    # Ingestion Pipeline
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+    INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "50"))
+    # Extracted page text per file hash, so unchanged PDFs are not re-parsed
+    PARSE_CACHE_ENABLED = os.getenv("PARSE_CACHE_ENABLED", "true").lower() == "true"
+    PARSE_CACHE_MAX_DOCUMENTS = int(os.getenv("PARSE_CACHE_MAX_DOCUMENTS", "500"))
+    # Uploads are held in memory up to the spool size, then spill to a temp file
+    UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+    UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(16 * 1024 * 1024)))
+
+    # Retrieval: 'dense' (vector only, default) or 'hybrid' (vector + BM25, fused with RRF)
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense").lower()
+    RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "6"))
+    RETRIEVAL_DENSE_K = int(os.getenv("RETRIEVAL_DENSE_K", "4"))
+    RETRIEVAL_LEXICAL_K = int(os.getenv("RETRIEVAL_LEXICAL_K", "4"))
+    RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+
+    # Maximal marginal relevance: diversify dense hits (e.g. resume vs LinkedIn
+    # copies of the same facts). Lower lambda favours diversity.
+    MMR_ENABLED = os.getenv("MMR_ENABLED", "false").lower() == "true"
+    MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+    MMR_FETCH_K = int(os.getenv("MMR_FETCH_K", "20"))
+
+    # Reranking of over-fetched candidates: 'none', 'lexical' or 'cross-encoder'
+    # (cross-encoder needs sentence-transformers installed)
+    RERANK_MODE = os.getenv("RERANK_MODE", "none").lower()
+    RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", "12"))
+    RERANK_PRIOR_WEIGHT = float(os.getenv("RERANK_PRIOR_WEIGHT", "0.5"))
+    RERANK_SKIP_MARGIN = float(os.getenv("RERANK_SKIP_MARGIN", "0.25"))
+
+    # Prompt context packing (tokens counted with the LLM's tokenizer)
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+    CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "400"))
+    CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+
+    # /summary is regenerated per corpus version; browsers may reuse it this long
+    SUMMARY_MAX_AGE_SECONDS = int(os.getenv("SUMMARY_MAX_AGE_SECONDS", "300"))
+
+    # Cached answers go out in one write; a positive interval instead replays
+    # them to SSE / NDJSON clients in chunks of about this size, this far apart
+    STREAM_REPLAY_CHUNK_CHARS = int(os.getenv("STREAM_REPLAY_CHUNK_CHARS", "16"))
+    STREAM_REPLAY_INTERVAL_MS = float(os.getenv("STREAM_REPLAY_INTERVAL_MS", "0"))
+    # LLM token deltas are coalesced into one write per STREAM_FLUSH_MS or
+    # STREAM_FLUSH_BYTES, whichever comes first (0 disables coalescing)
+    STREAM_FLUSH_MS = float(os.getenv("STREAM_FLUSH_MS", "20"))
+    STREAM_FLUSH_BYTES = int(os.getenv("STREAM_FLUSH_BYTES", "256"))
+    # Chunks a coalesced /agent follower may fall behind before it is cut off
+    SINGLE_FLIGHT_BACKLOG = int(os.getenv("SINGLE_FLIGHT_BACKLOG", "1024"))
+
+    # Rolling conversation summaries
+    CONVERSATION_FOLD_MIN_MESSAGES = int(os.getenv("CONVERSATION_FOLD_MIN_MESSAGES", "4"))
+    CONVERSATION_SEGMENT_MESSAGES = int(os.getenv("CONVERSATION_SEGMENT_MESSAGES", "20"))
+    CONVERSATION_SESSION_CACHE_SIZE = int(os.getenv("CONVERSATION_SESSION_CACHE_SIZE", "1000"))
+    CONVERSATION_SESSION_TTL_SECONDS = int(os.getenv("CONVERSATION_SESSION_TTL_SECONDS", "86400"))
+
+    # Conversation memory compaction (expiry + merging old segments)
+    CONVERSATION_MAX_SEGMENTS = int(os.getenv("CONVERSATION_MAX_SEGMENTS", "4"))
+    CONVERSATION_COMPACTION_INTERVAL_SECONDS = float(os.getenv("CONVERSATION_COMPACTION_INTERVAL_SECONDS", "3600"))
+    CONVERSATION_COMPACTION_BATCH = int(os.getenv("CONVERSATION_COMPACTION_BATCH", "1000"))
+    CONVERSATION_COMPACTION_MAX_MERGES = int(os.getenv("CONVERSATION_COMPACTION_MAX_MERGES", "50"))
+
+    # Background Task Queue (post-response cache writes, summaries)
+    TASK_QUEUE_MAXSIZE = int(os.getenv("TASK_QUEUE_MAXSIZE", "100"))
+    TASK_QUEUE_WORKERS = int(os.getenv("TASK_QUEUE_WORKERS", "2"))
+    TASK_QUEUE_MAX_RETRIES = int(os.getenv("TASK_QUEUE_MAX_RETRIES", "2"))
+    TASK_QUEUE_BACKOFF_SECONDS = float(os.getenv("TASK_QUEUE_BACKOFF_SECONDS", "0.5"))
+    TASK_QUEUE_DRAIN_TIMEOUT = float(os.getenv("TASK_QUEUE_DRAIN_TIMEOUT", "10"))
+
+    # Logging: level for the app.* loggers, "text" or "json" lines
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
 
     @classmethod
     def validate(cls):
@@ -25,6 +137,6 @@ class Config:
         if cls.MODEL_PROVIDER == "openai" and not cls.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY is missing in environment variables.")
         
-        if not cls.MILVUS_URI or not cls.MILVUS_TOKEN:
+        if cls.VECTOR_BACKEND == "milvus" and (not cls.MILVUS_URI or not cls.MILVUS_TOKEN):
              # Warning only, as user might fill this later
-             print("WARNING: MILVUS_URI or MILVUS_TOKEN is missing.")
+             logger.warning("MILVUS_URI or MILVUS_TOKEN is missing.")
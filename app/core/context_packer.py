@@ -0,0 +1,121 @@
+
+import logging
+import re
+from typing import List
+
+from langchain_core.documents import Document
+
+from app.core.utils import count_tokens
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _overlap(first: str, second: str, min_chars: int, max_chars: int) -> int:
+    """Length of the longest suffix of `first` that is a prefix of `second`."""
+    for n in range(min(len(first), len(second), max_chars), min_chars - 1, -1):
+        if first.endswith(second[:n]):
+            return n
+    return 0
+
+
+def drop_near_duplicates(docs: List[Document], threshold: float) -> List[Document]:
+    """
+    Drops documents whose word 3-shingles are mostly contained in an
+    earlier (better ranked) document's.
+    """
+    kept = []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        duplicate = False
+        for _, kept_shingles in kept:
+            smaller = min(len(shingles), len(kept_shingles))
+            if smaller and len(shingles & kept_shingles) / smaller >= threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append((doc, shingles))
+    return [doc for doc, _ in kept]
+
+
+def merge_adjacent(docs: List[Document], min_overlap: int = 10, max_overlap: int = 200) -> List[Document]:
+    """
+    Joins chunks of the same source/page whose texts overlap end-to-start
+    (the splitter's chunk_overlap), so the shared text appears once. A merged
+    chunk keeps the position of its best ranked part.
+    """
+    # [key, text, best rank]; chains of neighbours are merged until none overlap
+    groups: List[list] = [
+        [(doc.metadata.get("source"), doc.metadata.get("page")), doc.page_content, rank]
+        for rank, doc in enumerate(docs)
+    ]
+    merged = True
+    while merged:
+        merged = False
+        for i, j in ((i, j) for i in range(len(groups)) for j in range(len(groups)) if i != j):
+            first, second = groups[i], groups[j]
+            if first[0] != second[0] or first[0] == (None, None):
+                continue
+            n = _overlap(first[1], second[1], min_overlap, max_overlap)
+            if n:
+                first[1] += second[1][n:]
+                first[2] = min(first[2], second[2])
+                del groups[j]
+                merged = True
+                break
+
+    return [
+        Document(page_content=text, metadata=dict(docs[rank].metadata))
+        for _, text, rank in sorted(groups, key=lambda group: group[2])
+    ]
+
+
+def pack_context(
+    docs: List[Document],
+    token_budget: int,
+    model: str,
+    dedup_threshold: float = 0.8,
+    merge: bool = True,
+) -> List[Document]:
+    """
+    Fits ranked documents into a prompt token budget.
+
+    Near-duplicates are dropped, overlapping neighbours merged, then documents
+    are taken in rank order while they fit; one that does not fit is skipped
+    so a smaller, lower ranked one can still use the remaining budget.
+
+    Args:
+        docs: Documents ordered best first
+        token_budget: Maximum tokens across the packed documents
+        model: Model whose tokenizer counts the tokens
+        dedup_threshold: Shingle containment above which a document is a duplicate
+        merge: Whether to merge adjacent chunks of the same source/page
+
+    Returns:
+        Packed documents, best first
+    """
+    if not docs:
+        return []
+    candidates = drop_near_duplicates(docs, dedup_threshold)
+    if merge:
+        candidates = merge_adjacent(candidates)
+
+    packed = []
+    used = 0
+    for doc in candidates:
+        tokens = count_tokens(doc.page_content, model)
+        if used + tokens > token_budget:
+            continue
+        packed.append(doc)
+        used += tokens
+
+    logger.debug("Packed context: %d docs -> %d, %d/%d tokens", len(docs), len(packed), used, token_budget)
+    return packed
@@ -1,41 +1,143 @@
 
-from langchain_milvus import Milvus
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from app.core.factory import get_llm, get_embeddings
+from langchain_core.documents import Document
+from pymilvus import (
+    utility,
+    FieldSchema,
+    CollectionSchema,
+    DataType,
+    Collection,
+)
 from app.core.config import Config
+from app.core.factory import clients, get_llm, get_embeddings
+from app.core.local_vector_store import LocalVectorStore
+from app.core.milvus_executor import milvus_executor
+from app.core.session_store import HotSession, SessionStore
+from app.core.task_queue import task_queue
+from app.core.utils import quote_expr
 from datetime import datetime
 from typing import List, Dict
+import asyncio
+import hashlib
+import logging
 import re
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+ROW_FIELDS = ["id", "session_id", "summary", "timestamp", "message_count", "segment", "topics"]
 
 class ConversationMemory:
-    """Manages conversation summaries with Milvus vector storage."""
+    """
+    Manages conversation summaries with Milvus vector storage.
+
+    Each session has a rolling summary: new messages are folded into the
+    prior summary and the session's row is replaced (one row per segment of
+    CONVERSATION_SEGMENT_MESSAGES messages) rather than a new row appended
+    every turn. Hashes of already-folded messages are kept per session, so a
+    window with nothing new skips the LLM call.
+
+    Active sessions live in a hot in-process store holding their summaries
+    and vectors: relevance lookups are answered there with NumPy, and
+    summary rows are written behind through the background task queue. Only
+    a cold session is loaded from the vector store.
+
+    The Milvus collection has a managed schema: typed integer fields and
+    `session_id` as the partition key, so per-session queries only touch one
+    partition. A periodic compaction expires idle sessions and merges old
+    segments of long ones.
+    """
     
     def __init__(self):
-        self.embeddings = get_embeddings()
-        self.llm = get_llm()
         self.collection_name = "conversation_memory"
-        
-        # Initialize Milvus vector store
-        if not Config.MILVUS_URI or not Config.MILVUS_TOKEN:
-            print("Warning: Milvus not configured. Conversation memory disabled.")
-            self.vector_store = None
-            return
-            
+        self.dims = 1536 # OpenAI text-embedding-3-small dimension
+        self._collection = None
+        self.sessions = SessionStore(
+            max_sessions=Config.CONVERSATION_SESSION_CACHE_SIZE,
+            ttl_seconds=Config.CONVERSATION_SESSION_TTL_SECONDS,
+            on_evict_dirty=self._schedule_flush,
+        )
+        self.folds = 0
+        self.skipped_folds = 0
+        self.cold_loads = 0
+        self.writes = 0
+        self.compactions = 0
+        self.last_compaction = None
+        self._compactor = None
+        # Per-session locks over its stored rows: cold loads, write-behind
+        # flushes and compaction of the same session never interleave
+        self._row_locks = weakref.WeakValueDictionary()
+
+    @property
+    def embeddings(self):
+        return get_embeddings()
+
+    @property
+    def llm(self):
+        return get_llm()
+
+    @property
+    def collection(self):
+        """
+        Summary collection, created on first use (None when Milvus is
+        unavailable). With the local backend this is the in-process
+        LocalVectorStore instead.
+        """
+        if self._collection is None:
+            try:
+                if Config.VECTOR_BACKEND == "local":
+                    self._collection = clients.vector_store(self.collection_name)
+                elif Config.MILVUS_URI and Config.MILVUS_TOKEN:
+                    clients.milvus_connection("default")
+                    self._collection = self._get_or_create_collection()
+            except Exception as e:
+                logger.error("Error initializing conversation memory: %s", e)
+        return self._collection
+
+    def _get_or_create_collection(self):
+        if utility.has_collection(self.collection_name):
+            collection = Collection(self.collection_name)
+            fields = {field.name: field for field in collection.schema.fields}
+            if (
+                set(ROW_FIELDS) <= set(fields)
+                and fields["timestamp"].dtype == DataType.INT64
+                and getattr(fields["session_id"], "is_partition_key", False)
+            ):
+                collection.load()
+                return collection
+            # Collections auto-created by langchain_milvus keep everything as
+            # strings in one flat partition. Summaries only matter for the
+            # lifetime of a session, so rebuild with the managed schema.
+            logger.info("Recreating %s with the partitioned schema", self.collection_name)
+            utility.drop_collection(self.collection_name)
+
+        fields = [
+            FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
+            FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=self.dims),
+            FieldSchema(name="session_id", dtype=DataType.VARCHAR, max_length=128, is_partition_key=True),
+            FieldSchema(name="summary", dtype=DataType.VARCHAR, max_length=8192),
+            FieldSchema(name="timestamp", dtype=DataType.INT64),
+            FieldSchema(name="message_count", dtype=DataType.INT64),
+            FieldSchema(name="segment", dtype=DataType.INT64),
+            FieldSchema(name="topics", dtype=DataType.VARCHAR, max_length=1000),
+        ]
+        schema = CollectionSchema(fields, "Rolling conversation summaries")
+        collection = Collection(self.collection_name, schema)
+
+        collection.create_index(
+            field_name="vector",
+            index_params={"metric_type": "COSINE", "index_type": "AUTOINDEX", "params": {}}
+        )
+        # Session filters are already pruned to one partition; the inverted
+        # index speeds up the match within it where the server supports it.
         try:
-            self.vector_store = Milvus(
-                embedding_function=self.embeddings,
-                connection_args={
-                    "uri": Config.MILVUS_URI,
-                    "token": Config.MILVUS_TOKEN,
-                },
-                collection_name=self.collection_name,
-                auto_id=True,
-            )
-            print(f"Conversation memory initialized with collection: {self.collection_name}")
+            collection.create_index(field_name="session_id", index_params={"index_type": "INVERTED"})
         except Exception as e:
-            print(f"Error initializing conversation memory: {e}")
-            self.vector_store = None
+            logger.warning("Skipping session_id scalar index: %s", e)
+        collection.load()
+        return collection
     
     async def summarize_conversation(self, messages: List[Dict[str, str]]) -> str:
         """
@@ -73,50 +175,304 @@ Summary:"""
         
         return summary.strip()
     
+    async def fold_summary(self, prior_summary: str, messages: List[Dict[str, str]]) -> str:
+        """
+        Fold new messages into an existing summary using LLM.
+        
+        Args:
+            prior_summary: Running summary of the session so far
+            messages: Messages not yet covered by the summary
+            
+        Returns:
+            Updated summary string
+        """
+        template = """Update the running summary of a conversation with the new messages below.
+Keep what still matters from the existing summary, add the new:
+- Key topics discussed
+- Questions asked by the user
+- Important information shared by the assistant
+
+Keep the summary under 100 words and write in third person.
+
+Existing summary:
+{summary}
+
+New messages:
+{conversation}
+
+Updated summary:"""
+        
+        prompt = ChatPromptTemplate.from_template(template)
+        conversation_text = "\n".join([
+            f"{msg['role'].capitalize()}: {msg['content']}" 
+            for msg in messages
+        ])
+        
+        chain = prompt | self.llm | StrOutputParser()
+        summary = await chain.ainvoke({"summary": prior_summary, "conversation": conversation_text})
+        
+        return summary.strip()
+
+    @staticmethod
+    def _message_hash(message: Dict[str, str]) -> str:
+        text = f"{message.get('role', '')}\x00{message.get('content', '')}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+    # --- Storage (blocking; run on the Milvus executor) ----------------
+
+    @staticmethod
+    def _local_row(doc: Document) -> dict:
+        row = dict(doc.metadata)
+        row["id"] = row.pop("pk", None)
+        row["summary"] = doc.page_content
+        return row
+
+    def _load_rows(self, session_id: str) -> List[dict]:
+        """Every stored summary row of a session (with its vector where stored), oldest first."""
+        collection = self.collection
+        # The session id comes from the client
+        expr = f'session_id == "{quote_expr(session_id)}"'
+        if isinstance(collection, LocalVectorStore):
+            rows = [self._local_row(doc) for doc in collection.search_by_metadata(expr, limit=1000)]
+        else:
+            rows = collection.query(expr=expr, output_fields=ROW_FIELDS + ["vector"], limit=1000)
+        return sorted(rows, key=lambda row: int(row.get("timestamp") or 0))
+
+    def _scan_sessions(self) -> Dict[str, dict]:
+        """
+        Row ids, newest timestamp and stored bytes of every session. Rows are
+        read in batches of CONVERSATION_COMPACTION_BATCH and only these
+        aggregates are kept, not the summaries.
+        """
+        sessions = {}
+
+        def add(rows):
+            for row in rows:
+                entry = sessions.setdefault(row.get("session_id"), {"ids": [], "last": 0, "bytes": 0})
+                entry["ids"].append(row["id"])
+                entry["last"] = max(entry["last"], int(row.get("timestamp") or 0))
+                entry["bytes"] += self._row_bytes(row)
+
+        collection = self.collection
+        if isinstance(collection, LocalVectorStore):
+            docs = collection.search_by_metadata("", limit=collection.count())
+            add(self._local_row(doc) for doc in docs)
+            return sessions
+
+        iterator = collection.query_iterator(
+            batch_size=Config.CONVERSATION_COMPACTION_BATCH,
+            expr="id >= 0",
+            output_fields=ROW_FIELDS
+        )
+        try:
+            while rows := iterator.next():
+                add(rows)
+        finally:
+            iterator.close()
+        return sessions
+
+    def _insert_row(self, summary: str, vector, metadata: dict):
+        """Inserts one summary row and returns its primary key."""
+        collection = self.collection
+        if isinstance(collection, LocalVectorStore):
+            return collection.add_embeddings(texts=[summary], embeddings=[vector], metadatas=[metadata])[0]
+
+        # Pymilvus insert expects list of columns.
+        result = collection.insert([
+            [vector],
+            [metadata["session_id"]],
+            [summary],
+            [metadata["timestamp"]],
+            [metadata["message_count"]],
+            [metadata["segment"]],
+            [metadata["topics"]],
+        ])
+        return result.primary_keys[0]
+
+    def _delete_rows(self, ids: List[int]):
+        collection = self.collection
+        if isinstance(collection, LocalVectorStore):
+            collection.delete(ids=ids)
+        else:
+            collection.delete(expr=f"id in {list(ids)}")
+
+    def _row_bytes(self, row: dict) -> int:
+        """Approximate stored size of a row: vector, integer fields and strings."""
+        strings = (row.get("session_id") or "", row.get("summary") or "", row.get("topics") or "")
+        return self.dims * 4 + 4 * 8 + sum(len(str(value).encode("utf-8")) for value in strings)
+
+    # --- Hot sessions ---------------------------------------------------
+
+    def _row_lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._row_locks.get(session_id)
+        if lock is None:
+            lock = self._row_locks[session_id] = asyncio.Lock()
+        return lock
+
+    async def _session(self, session_id: str) -> HotSession:
+        """The hot session, loading a cold one from the vector store first."""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            return session
+        async with self._row_lock(session_id):
+            return await self._load_session(session_id)
+
+    async def _load_session(self, session_id: str) -> HotSession:
+        # Loaded by a concurrent caller while this one waited for the lock
+        session = self.sessions.get(session_id)
+        if session is not None:
+            return session
+
+        # Cold session: one partition-pruned query. Rows carry their vectors
+        # (the local backend re-embeds, normally embedding cache hits). Which
+        # messages the rolling summary covered is unknown, so the current
+        # window is folded once.
+        self.cold_loads += 1
+        session = HotSession(session_id)
+        rows = await milvus_executor.run(self._load_rows, session_id)
+        if rows:
+            missing = [row for row in rows if row.get("vector") is None]
+            if missing:
+                vectors = await self.embeddings.aembed_documents([row["summary"] for row in missing])
+                for row, vector in zip(missing, vectors):
+                    row["vector"] = vector
+            for segment, row in enumerate(rows):
+                metadata = {
+                    "session_id": session_id,
+                    "timestamp": int(row.get("timestamp") or 0),
+                    "message_count": int(row.get("message_count") or 0),
+                    "segment": segment,
+                    "topics": row.get("topics") or "",
+                }
+                session.set_segment(segment, row["summary"], row["vector"], metadata)
+            session.current_segment = len(rows) - 1
+            session.pk = rows[-1].get("id")
+            session.segment_messages = int(rows[-1].get("message_count") or 0)
+        return self.sessions.put(session)
+
+    def _schedule_flush(self, session: HotSession):
+        task_queue.enqueue("conversation_memory.flush", lambda: self._flush(session))
+
+    async def _flush(self, session: HotSession):
+        """Writes the session's rolling segment row if it changed, replacing its previous row."""
+        async with self._row_lock(session.session_id), session.lock:
+            await self._write(session)
+
+    async def _write(self, session: HotSession):
+        if not session.dirty:
+            return
+        if not await milvus_executor.run(lambda: self.collection):
+            return
+        text, vector, metadata = session.segments[session.current_segment]
+        pk = await milvus_executor.run(self._insert_row, text, vector.tolist(), metadata)
+        if session.pk is not None:
+            await milvus_executor.run(self._delete_rows, [session.pk])
+        session.pk = pk
+        session.dirty = False
+        self.writes += 1
+
+    async def flush_all(self):
+        """Writes every hot session with an unwritten summary (e.g. at shutdown)."""
+        for session in self.sessions.dirty_sessions():
+            try:
+                await self._flush(session)
+            except Exception as e:
+                logger.error("Error flushing conversation summary: %s", e)
+    
     async def store_summary(self, session_id: str, messages: List[Dict[str, str]]):
         """
-        Store conversation summary in Milvus.
+        Fold new messages into the session's rolling summary.
+
+        The hot session is updated immediately; the row upsert is queued as
+        a separate write-behind job.
         
         Args:
             session_id: Unique session identifier
-            messages: List of messages to summarize
+            messages: Recent messages; ones already folded are ignored
+
+        Raises:
+            Exception: Summarization failures are re-raised so the background
+                task queue can retry them.
         """
-        if not self.vector_store:
-            print("Conversation memory not available. Skipping summary storage.")
+        if not await milvus_executor.run(lambda: self.collection):
+            logger.warning("Conversation memory not available. Skipping summary storage.")
             return
-        
+
         try:
-            # Generate summary
-            summary = await self.summarize_conversation(messages)
-            
-            # Extract topics (simple keyword extraction)
-            topics = self._extract_topics(summary)
-            
-            # Create metadata
-            metadata = {
-                "session_id": session_id,
-                "summary": summary,
-                "timestamp": str(int(datetime.utcnow().timestamp() * 1000)),  # Unix timestamp in ms
-                "message_count": str(len(messages)),
-                "topics": ",".join(topics)
-            }
-            
-            # Store in Milvus
-            self.vector_store.add_texts(
-                texts=[summary],
-                metadatas=[metadata]
-            )
-            
-            print(f"Stored conversation summary for session {session_id[:20]}... ({len(messages)} messages)")
-            
+            session = await self._session(session_id)
+            async with session.lock:
+                new_messages = {}
+                for message in messages:
+                    message_hash = self._message_hash(message)
+                    if message_hash not in session.folded:
+                        new_messages.setdefault(message_hash, message)
+                new_hashes, new_messages = list(new_messages), list(new_messages.values())
+                if len(new_messages) < Config.CONVERSATION_FOLD_MIN_MESSAGES:
+                    self.skipped_folds += 1
+                    return
+
+                # A full segment keeps its row; the next one starts a fresh summary
+                if session.segment_messages >= Config.CONVERSATION_SEGMENT_MESSAGES:
+                    await self._write(session)
+                    if session.segments:
+                        session.current_segment += 1
+                    session.pk = None
+                    session.segment_messages = 0
+
+                if session.summary:
+                    summary = await self.fold_summary(session.summary, new_messages)
+                else:
+                    summary = await self.summarize_conversation(new_messages)
+                self.folds += 1
+                vector = await self.embeddings.aembed_query(summary)
+                
+                # Extract topics (simple keyword extraction)
+                topics = self._extract_topics(summary)
+                segment_messages = session.segment_messages + len(new_messages)
+                
+                # Create metadata
+                metadata = {
+                    "session_id": session_id,
+                    "timestamp": int(datetime.utcnow().timestamp() * 1000),  # Unix timestamp in ms
+                    "message_count": segment_messages,
+                    "segment": session.current_segment,
+                    "topics": ",".join(topics)
+                }
+
+                session.set_segment(session.current_segment, summary, vector, metadata)
+                session.segment_messages = segment_messages
+                session.folded.extend(new_hashes)
+                session.dirty = True
+                logger.debug("Updated conversation summary for session %.20s... (+%d messages)", session_id, len(new_messages))
+
+            # Write-behind; a dropped job leaves the session dirty for the next flush
+            self._schedule_flush(session)
+                
         except Exception as e:
-            print(f"Error storing conversation summary: {e}")
+            logger.error("Error storing conversation summary: %s", e)
+            raise
     
+    async def has_memory(self, session_id: str) -> bool:
+        """
+        Whether the session has stored summaries. Loads the session into the
+        hot store, so the context lookup that follows is answered in process.
+        """
+        if not await milvus_executor.run(lambda: self.collection):
+            return False
+        try:
+            session = await self._session(session_id)
+        except Exception as e:
+            logger.error("Error loading conversation memory: %s", e)
+            # Unknown history: don't share another session's answer
+            return True
+        return bool(session.segments)
+
     async def retrieve_relevant_context(
         self, 
         query: str, 
         session_id: str, 
-        k: int = 3
+        k: int = 3,
+        embedding: List[float] = None
     ) -> List:
         """
         Retrieve relevant conversation summaries for a given query.
@@ -125,33 +481,185 @@ Summary:"""
             query: Current user question
             session_id: Session to filter by
             k: Number of summaries to retrieve
+            embedding: Precomputed query embedding (embedded here if omitted)
             
         Returns:
             List of Document objects with relevant summaries
         """
-        if not self.vector_store:
+        if not await milvus_executor.run(lambda: self.collection):
             return []
         
         try:
-            # Create retriever with session filter
-            retriever = self.vector_store.as_retriever(
-                search_kwargs={
-                    "k": k,
-                    "expr": f'session_id == "{session_id}"'  # Filter by session
-                }
+            session = await self._session(session_id)
+            if not session.segments:
+                return []
+
+            if embedding is None:
+                embedding = await self.embeddings.aembed_query(query)
+
+            # Answered from the hot session; MMR avoids near-identical summaries
+            results = session.search(
+                embedding,
+                k,
+                mmr_fetch_k=max(Config.MMR_FETCH_K, k) if Config.MMR_ENABLED else 0,
+                lambda_mult=Config.MMR_LAMBDA
             )
-            
-            docs = await retriever.ainvoke(query)
+            docs = [Document(page_content=text, metadata=dict(metadata)) for text, metadata in results]
             
             if docs:
-                print(f"Retrieved {len(docs)} conversation summaries for session {session_id[:20]}...")
+                logger.debug("Retrieved %d conversation summaries for session %.20s...", len(docs), session_id)
             
             return docs
             
         except Exception as e:
-            print(f"Error retrieving conversation context: {e}")
+            logger.error("Error retrieving conversation context: %s", e)
             return []
     
+    # --- Compaction -----------------------------------------------------
+
+    async def merge_summaries(self, summaries: List[str]) -> str:
+        """
+        Merge the summaries of consecutive conversation segments using LLM.
+        
+        Args:
+            summaries: Segment summaries, oldest first
+            
+        Returns:
+            Single summary string
+        """
+        template = """Merge the following summaries of consecutive parts of one conversation into a single summary.
+Keep the key topics, the user's questions and the important information shared.
+
+Keep the summary under 150 words and write in third person.
+
+Summaries (oldest first):
+{summaries}
+
+Merged summary:"""
+        
+        prompt = ChatPromptTemplate.from_template(template)
+        chain = prompt | self.llm | StrOutputParser()
+        summary = await chain.ainvoke({"summaries": "\n\n".join(summaries)})
+        
+        return summary.strip()
+
+    async def compact(self) -> dict:
+        """
+        Expires sessions idle longer than the session TTL and merges the
+        closed segments of sessions with more than
+        CONVERSATION_MAX_SEGMENTS rows into one. Hot sessions are left alone.
+
+        Returns:
+            Report of sessions/rows removed and bytes reclaimed
+        """
+        started = time.perf_counter()
+        report = {
+            "sessions_expired": 0,
+            "sessions_merged": 0,
+            "rows_deleted": 0,
+            "rows_written": 0,
+            "bytes_reclaimed": 0,
+        }
+        if not await milvus_executor.run(lambda: self.collection):
+            return report
+
+        sessions = await milvus_executor.run(self._scan_sessions)
+        cutoff = int((time.time() - Config.CONVERSATION_SESSION_TTL_SECONDS) * 1000)
+        merges = 0
+        for session_id, entry in sessions.items():
+            if session_id in self.sessions:
+                continue
+            expired = entry["last"] < cutoff
+            if not expired and (
+                len(entry["ids"]) <= Config.CONVERSATION_MAX_SEGMENTS
+                or merges >= Config.CONVERSATION_COMPACTION_MAX_MERGES
+            ):
+                continue
+
+            # Held while the session's rows change, so a request can't load
+            # it halfway; one that made it hot since the scan is left alone
+            async with self._row_lock(session_id):
+                if session_id in self.sessions:
+                    continue
+                if expired:
+                    await milvus_executor.run(self._delete_rows, entry["ids"])
+                    report["sessions_expired"] += 1
+                    report["rows_deleted"] += len(entry["ids"])
+                    report["bytes_reclaimed"] += entry["bytes"]
+                    continue
+
+                merges += 1
+                if await self._merge_session(session_id, report):
+                    report["sessions_merged"] += 1
+
+        report["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        self.compactions += 1
+        self.last_compaction = report
+        if report["rows_deleted"]:
+            logger.info(
+                "Compacted conversation memory: %d sessions expired, %d merged, %d rows / %d bytes reclaimed",
+                report["sessions_expired"], report["sessions_merged"], report["rows_deleted"], report["bytes_reclaimed"]
+            )
+        return report
+
+    async def _merge_session(self, session_id: str, report: dict) -> bool:
+        """Merges a cold session's closed segments into one row. Returns whether it did."""
+        session_rows = await milvus_executor.run(self._load_rows, session_id)
+        if len(session_rows) <= Config.CONVERSATION_MAX_SEGMENTS:
+            return False
+        # The newest (rolling) segment stays; the closed ones become one row
+        closed = session_rows[:-1]
+        summary = await self.merge_summaries([row["summary"] for row in closed])
+        vector = await self.embeddings.aembed_query(summary)
+        metadata = {
+            "session_id": session_id,
+            "timestamp": int(closed[-1].get("timestamp") or 0),
+            "message_count": sum(int(row.get("message_count") or 0) for row in closed),
+            "segment": 0,
+            "topics": ",".join(self._extract_topics(summary)),
+        }
+        # Insert before deleting so a failure never loses the history
+        await milvus_executor.run(self._insert_row, summary, vector, metadata)
+        await milvus_executor.run(self._delete_rows, [row["id"] for row in closed])
+        report["rows_deleted"] += len(closed)
+        report["rows_written"] += 1
+        report["bytes_reclaimed"] += (
+            sum(self._row_bytes(row) for row in closed) - self._row_bytes({**metadata, "summary": summary})
+        )
+        return True
+
+    async def _compact_loop(self, interval):
+        while True:
+            try:
+                await self.compact()
+            except Exception as e:
+                logger.error("Conversation memory compaction failed: %s", e)
+            await asyncio.sleep(interval)
+
+    def start_compactor(self):
+        """Starts the periodic compaction on the running event loop."""
+        if self._compactor is None:
+            self._compactor = asyncio.create_task(
+                self._compact_loop(Config.CONVERSATION_COMPACTION_INTERVAL_SECONDS)
+            )
+
+    async def stop_compactor(self):
+        if self._compactor is not None:
+            self._compactor.cancel()
+            await asyncio.gather(self._compactor, return_exceptions=True)
+            self._compactor = None
+
+    def stats(self):
+        return {
+            "sessions": self.sessions.stats(),
+            "cold_loads": self.cold_loads,
+            "folds": self.folds,
+            "skipped_folds": self.skipped_folds,
+            "writes": self.writes,
+            "compactions": self.compactions,
+            "last_compaction": self.last_compaction,
+        }
+    
     def _extract_topics(self, text: str) -> List[str]:
         """
         Extract key topics from summary text.
@@ -0,0 +1,106 @@
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class CorpusState:
+    """
+    Tracks the version of the ingested portfolio corpus.
+
+    The version is a short digest of the stored chunks themselves (see
+    ingestion.sync_corpus_version), so it can be re-derived from the vector
+    store after CACHE_DIR is lost, e.g. on a redeploy. It is also kept in
+    CACHE_DIR, so a restart knows it before the store is read. Anything
+    derived from the corpus (cached answers, the profile summary) is stamped
+    with the version it was built from.
+
+    `known` is False until the version was loaded or derived; a missing file
+    is not a new corpus, so nothing may treat "initial" as authoritative.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = "initial"
+        self.updated_at = 0
+        self.known = False
+        self._listeners = []
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.version = data.get("version", self.version)
+            self.updated_at = data.get("updated_at", 0)
+            self.known = "version" in data
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Could not read corpus state: %s", e)
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.version, "updated_at": self.updated_at}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning("Could not persist corpus state: %s", e)
+
+    def on_change(self, callback):
+        """Registers `callback(version)` to run whenever the version changes."""
+        self._listeners.append(callback)
+
+    def set_content(self, content_digest: str) -> str:
+        """
+        Sets the version from a digest of the stored corpus content.
+
+        Args:
+            content_digest: Hex digest over every stored chunk
+
+        Returns:
+            The version string
+        """
+        self.known = True
+        if content_digest[:16] == self.version:
+            return self.version
+        return self._set(content_digest[:16])
+
+    def bump(self, fingerprint: str) -> str:
+        """
+        Advances the version after an ingest changed the corpus, when the
+        stored content could not be read to derive it.
+
+        Args:
+            fingerprint: Digest of the ingested change (e.g. hash of chunk contents)
+
+        Returns:
+            The new version string
+        """
+        digest = hashlib.sha256(f"{self.version}:{fingerprint}".encode("utf-8")).hexdigest()
+        return self._set(digest[:16])
+
+    def _set(self, version: str) -> str:
+        self.version = version
+        self.updated_at = int(time.time())
+        self._save()
+        logger.info("Corpus version is now %s", self.version)
+
+        for callback in self._listeners:
+            try:
+                callback(self.version)
+            except Exception as e:
+                logger.error("Corpus change listener failed: %s", e)
+        return self.version
+
+
+# Global instance
+corpus_state = CorpusState(os.path.join(Config.CACHE_DIR, "corpus.json"))
@@ -0,0 +1,162 @@
+
+import asyncio
+import time
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+
+class BatchingEmbeddings(Embeddings):
+    """
+    Micro-batches concurrent async embedding calls into one provider request.
+
+    Calls arriving within `max_wait_ms` of each other are queued and sent as a
+    single `aembed_documents` call once the window closes or `max_batch_size`
+    texts are waiting, whichever comes first; each caller then gets its own
+    slice of the result. Calls that alone fill a batch, and all sync calls
+    (made from worker threads), go straight to the underlying model.
+
+    If a merged batch fails, each caller's texts are retried on their own, so
+    one bad input (or a batch-size limit) only fails the caller it belongs to.
+    """
+
+    def __init__(self, underlying: Embeddings, max_batch_size: int = 64, max_wait_ms: float = 8.0):
+        self.underlying = underlying
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._loop = None
+        self._pending = []
+        self._pending_texts = 0
+        self._timer = None
+        self._dispatches = set()
+        self.requests = 0
+        self.batched_requests = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.size_flushes = 0
+        self.timer_flushes = 0
+        self.passthrough = 0
+        self.failed_batches = 0
+        self.retried_requests = 0
+        self.failed_requests = 0
+        self.total_wait_ms = 0.0
+
+    def _bind_loop(self, loop):
+        # Scripts may run several event loops in turn; pending work never
+        # outlives its loop, so state is simply rebound to the current one.
+        if self._loop is not loop:
+            self._loop = loop
+            self._pending = []
+            self._pending_texts = 0
+            self._timer = None
+            self._dispatches = set()
+
+    def _flush(self, reason: str):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_texts = self._pending, [], 0
+        if reason == "size":
+            self.size_flushes += 1
+        else:
+            self.timer_flushes += 1
+        task = self._loop.create_task(self._dispatch(batch))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch):
+        texts = [text for item_texts, _, _ in batch for text in item_texts]
+        now = time.perf_counter()
+        self.batches += 1
+        self.batched_texts += len(texts)
+        self.total_wait_ms += sum((now - queued_at) * 1000 for _, _, queued_at in batch)
+        try:
+            vectors = await self.underlying.aembed_documents(texts)
+        except Exception as e:
+            self.failed_batches += 1
+            if len(batch) == 1:
+                self._settle(batch[0][1], e)
+                return
+            await self._retry_separately(batch)
+            return
+
+        offset = 0
+        for item_texts, future, _ in batch:
+            if not future.done():
+                future.set_result(vectors[offset:offset + len(item_texts)])
+            offset += len(item_texts)
+
+    async def _retry_separately(self, batch):
+        """Re-embeds each caller's texts in its own request after a merged batch failed."""
+        self.retried_requests += len(batch)
+        results = await asyncio.gather(
+            *(self.underlying.aembed_documents(item_texts) for item_texts, _, _ in batch),
+            return_exceptions=True
+        )
+        for (_, future, _), result in zip(batch, results):
+            if isinstance(result, BaseException):
+                self._settle(future, result)
+            elif not future.done():
+                future.set_result(result)
+
+    def _settle(self, future, error: BaseException):
+        self.failed_requests += 1
+        if not future.done():
+            future.set_exception(error)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        self.requests += 1
+        if len(texts) >= self.max_batch_size:
+            self.passthrough += 1
+            return await self.underlying.aembed_documents(texts)
+        self.batched_requests += 1
+
+        loop = asyncio.get_running_loop()
+        self._bind_loop(loop)
+        # Keep each batch within the size limit
+        if self._pending_texts + len(texts) > self.max_batch_size:
+            self._flush("size")
+
+        future = loop.create_future()
+        self._pending.append((texts, future, time.perf_counter()))
+        self._pending_texts += len(texts)
+        if self._pending_texts >= self.max_batch_size:
+            self._flush("size")
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush, "timer")
+        return await future
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        self.passthrough += 1
+        return self.underlying.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self.requests += 1
+        self.passthrough += 1
+        return self.underlying.embed_query(text)
+
+    def stats(self):
+        """Batch counts, fill ratio and queueing delay."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "requests": self.requests,
+            "batches": self.batches,
+            "passthrough": self.passthrough,
+            "size_flushes": self.size_flushes,
+            "timer_flushes": self.timer_flushes,
+            "failed_batches": self.failed_batches,
+            "retried_requests": self.retried_requests,
+            "failed_requests": self.failed_requests,
+            "avg_requests_per_batch": round(self.batched_requests / self.batches, 2) if self.batches else 0.0,
+            "avg_fill_ratio": round(self.batched_texts / (self.batches * self.max_batch_size), 4) if self.batches else 0.0,
+            "avg_wait_ms": round(self.total_wait_ms / self.batched_requests, 2) if self.batched_requests else 0.0,
+        }
@@ -0,0 +1,242 @@
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed cache in front of an embeddings model.
+
+    Vectors are keyed by (model name, sha256 of the text) and looked up in an
+    in-memory LRU first, then in a SQLite file holding float32 blobs. Only the
+    texts missing from both tiers are sent to the underlying model, in one
+    batched call.
+
+    Both tiers keep vectors as packed float32 (`array('f')`, about 6 KB for
+    1536 dimensions rather than ~50 KB as a list of floats); lists are only
+    built for the caller. The LRU is bounded by entries and by bytes.
+
+    On the async path only the in-memory tier runs on the event loop: SQLite
+    reads go to a worker thread and writes are written behind, so a disk
+    commit never stalls other requests.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        path: str = None,
+        max_entries: int = 10000,
+        max_bytes: int = 32 * 1024 * 1024,
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._pending_writes = set()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                    "PRIMARY KEY (model, text_hash))"
+                )
+                self._db.commit()
+            except Exception as e:
+                logger.warning("Embedding cache disk tier disabled: %s", e)
+                self._db = None
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _remember(self, text_hash: str, vector: array):
+        previous = self._memory.pop(text_hash, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous) * previous.itemsize
+        self._memory[text_hash] = vector
+        self._memory_bytes += len(vector) * vector.itemsize
+        while self._memory and (len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted) * evicted.itemsize
+
+    def _memory_lookup(self, hashes: List[str]):
+        """Resolves hashes from memory. Returns the vectors (None for misses) and the miss indexes."""
+        vectors = [None] * len(hashes)
+        disk_needed = []
+        with self._lock:
+            for i, text_hash in enumerate(hashes):
+                vector = self._memory.get(text_hash)
+                if vector is not None:
+                    self._memory.move_to_end(text_hash)
+                    self.memory_hits += 1
+                    vectors[i] = vector
+                else:
+                    disk_needed.append(i)
+        return vectors, disk_needed
+
+    def _disk_lookup(self, wanted: List[str]) -> dict:
+        """Blocking: vectors found on disk for the given hashes."""
+        found = {}
+        with self._db_lock:
+            if self._db is None:
+                return found
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(wanted), 500):
+                batch = wanted[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model_name, *batch]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[text_hash] = vector
+        return found
+
+    def _merge_disk(self, hashes, vectors, disk_needed, found):
+        with self._lock:
+            for i in disk_needed:
+                vector = found.get(hashes[i])
+                if vector is not None:
+                    self.disk_hits += 1
+                    self._remember(hashes[i], vector)
+                    vectors[i] = vector
+
+    def _disk_store(self, pairs):
+        """Blocking: writes (hash, vector) pairs to SQLite."""
+        with self._db_lock:
+            if self._db is None:
+                return
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                    [(self.model_name, text_hash, vector.tobytes()) for text_hash, vector in pairs]
+                )
+                self._db.commit()
+            except Exception as e:
+                logger.warning("Embedding cache write failed: %s", e)
+
+    def _memory_store(self, pairs):
+        with self._lock:
+            for text_hash, vector in pairs:
+                self._remember(text_hash, vector)
+
+    def _missing(self, texts, hashes, vectors):
+        missing = {}
+        for text, text_hash, vector in zip(texts, hashes, vectors):
+            if vector is None and text_hash not in missing:
+                missing[text_hash] = text
+        with self._lock:
+            self.misses += len(missing)
+        return missing
+
+    def _plan(self, texts: List[str]):
+        """Splits texts into cached vectors and the unique texts still to embed."""
+        hashes = [self._hash(text) for text in texts]
+        vectors, disk_needed = self._memory_lookup(hashes)
+        if disk_needed and self._db is not None:
+            found = self._disk_lookup(list({hashes[i] for i in disk_needed}))
+            self._merge_disk(hashes, vectors, disk_needed, found)
+        return hashes, vectors, self._missing(texts, hashes, vectors)
+
+    async def _aplan(self, texts: List[str]):
+        """_plan with the SQLite read on a worker thread."""
+        hashes = [self._hash(text) for text in texts]
+        vectors, disk_needed = self._memory_lookup(hashes)
+        if disk_needed and self._db is not None:
+            found = await asyncio.to_thread(self._disk_lookup, list({hashes[i] for i in disk_needed}))
+            self._merge_disk(hashes, vectors, disk_needed, found)
+        return hashes, vectors, self._missing(texts, hashes, vectors)
+
+    def _write_behind(self, pairs):
+        """Schedules the SQLite write on a worker thread without waiting for it."""
+        if self._db is None:
+            return
+        task = asyncio.get_running_loop().create_task(asyncio.to_thread(self._disk_store, pairs))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    @staticmethod
+    def _pack(missing, new_vectors) -> dict:
+        """Packs freshly computed vectors to float32, keyed by text hash."""
+        return {text_hash: array("f", vector) for text_hash, vector in zip(missing.keys(), new_vectors)}
+
+    @staticmethod
+    def _fill(hashes, vectors, computed) -> List[List[float]]:
+        return [
+            (vector if vector is not None else computed[text_hash]).tolist()
+            for text_hash, vector in zip(hashes, vectors)
+        ]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, vectors, missing = self._plan(texts)
+        computed = {}
+        if missing:
+            new_vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = self._pack(missing, new_vectors)
+            self._memory_store(computed.items())
+            self._disk_store(list(computed.items()))
+        return self._fill(hashes, vectors, computed)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, vectors, missing = await self._aplan(texts)
+        computed = {}
+        if missing:
+            new_vectors = await self.underlying.aembed_documents(list(missing.values()))
+            computed = self._pack(missing, new_vectors)
+            self._memory_store(computed.items())
+            self._write_behind(list(computed.items()))
+        return self._fill(hashes, vectors, computed)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def stats(self):
+        """Hit/miss counters per tier."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {
+                "model": self.model_name,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_enabled": self._db is not None,
+            }
+
+    def close(self):
+        # Waits for in-flight write-behind commits (they hold the same lock)
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,24 +1,246 @@
 
+import logging
+import os
+import threading
+from collections import defaultdict
+
+import httpx
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_milvus import Milvus
+from pymilvus import connections
 from app.core.config import Config
+from app.core.embedding_batcher import BatchingEmbeddings
+from app.core.embedding_cache import CachedEmbeddings
+from app.core.metrics import TimedEmbeddings
+from app.core.local_vector_store import LocalVectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    """
+    Owns the long-lived LLM, embedding and vector store clients.
+
+    Clients are created once (eagerly at app startup, or lazily on first use
+    from scripts) and shared by every caller, so each request reuses the same
+    pooled HTTP connections and Milvus channels instead of rebuilding them.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._llm = None
+        self._embeddings = None
+        self._embedding_batcher = None
+        self._vector_stores = {}
+        self._milvus_alias = None
+        self._http_client = None
+        self._http_async_client = None
+        self.usage = defaultdict(int)
+
+    # --- HTTP pools -----------------------------------------------------
+
+    def _http_limits(self):
+        return httpx.Limits(
+            max_connections=Config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE,
+        )
+
+    def _http_clients(self):
+        if self._http_client is None:
+            self._http_client = httpx.Client(limits=self._http_limits())
+            self._http_async_client = httpx.AsyncClient(limits=self._http_limits())
+        return self._http_client, self._http_async_client
+
+    # --- Clients --------------------------------------------------------
+
+    def llm(self):
+        """Returns the shared LLM client."""
+        with self._lock:
+            if self._llm is None:
+                self._llm = self._create_llm()
+            self.usage["llm"] += 1
+            return self._llm
+
+    def embeddings(self):
+        """Returns the shared embeddings client."""
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = self._create_embeddings()
+            self.usage["embeddings"] += 1
+            return self._embeddings
+
+    def vector_store(self, collection_name=None):
+        """
+        Returns the shared vector store for a collection, backed by Milvus or
+        by the in-process LocalVectorStore depending on Config.VECTOR_BACKEND.
+
+        Args:
+            collection_name: Collection name, defaults to the portfolio collection
+
+        Returns:
+            Vector store, or None when Milvus is selected but not configured
+        """
+        collection_name = collection_name or Config.COLLECTION_NAME
+        local = Config.VECTOR_BACKEND == "local"
+        if not local and (not Config.MILVUS_URI or not Config.MILVUS_TOKEN):
+            logger.warning("Milvus URI/Token not set. Vector store usage will fail.")
+            return None
+
+        with self._lock:
+            if collection_name not in self._vector_stores:
+                if local:
+                    store = LocalVectorStore(
+                        embedding_function=self.embeddings(),
+                        collection_name=collection_name,
+                        persist_dir=os.path.join(Config.CACHE_DIR, "vectors"),
+                        dtype=Config.LOCAL_VECTOR_DTYPE,
+                        persist_interval=Config.LOCAL_VECTOR_PERSIST_INTERVAL,
+                    )
+                else:
+                    store = Milvus(
+                        embedding_function=self.embeddings(),
+                        connection_args={
+                            "uri": Config.MILVUS_URI,
+                            "token": Config.MILVUS_TOKEN,
+                        },
+                        collection_name=collection_name,
+                        auto_id=True,
+                        # New collections accept extra metadata (e.g. chunk hashes)
+                        enable_dynamic_field=True,
+                    )
+                self._vector_stores[collection_name] = store
+            self.usage[f"vector_store:{collection_name}"] += 1
+            return self._vector_stores[collection_name]
+
+    def milvus_connection(self, alias="default"):
+        """Opens (once) the pymilvus ORM connection used by raw Collection access."""
+        with self._lock:
+            if not connections.has_connection(alias):
+                connections.connect(
+                    alias=alias,
+                    uri=Config.MILVUS_URI,
+                    token=Config.MILVUS_TOKEN
+                )
+            self._milvus_alias = alias
+            self.usage[f"milvus:{alias}"] += 1
+            return alias
+
+    def _create_llm(self):
+        if Config.MODEL_PROVIDER == "openai":
+            http_client, http_async_client = self._http_clients()
+            return ChatOpenAI(
+                model=Config.OPENAI_LLM_MODEL,
+                api_key=Config.OPENAI_API_KEY,
+                temperature=0,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+        else:
+            raise ValueError(f"Unsupported provider: {Config.MODEL_PROVIDER}")
+
+    def _create_embeddings(self):
+        if Config.MODEL_PROVIDER == "openai":
+            http_client, http_async_client = self._http_clients()
+            embeddings = OpenAIEmbeddings(
+                model=Config.OPENAI_EMBEDDING_MODEL,
+                api_key=Config.OPENAI_API_KEY,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+            model_name = Config.OPENAI_EMBEDDING_MODEL
+        else:
+            raise ValueError(f"Unsupported provider: {Config.MODEL_PROVIDER}")
+
+        # Times provider calls only: cache hits and batch waits are not counted
+        embeddings = TimedEmbeddings(embeddings)
+
+        # Batching sits beneath the cache, so only cache misses are merged
+        if Config.EMBEDDING_BATCH_ENABLED:
+            embeddings = BatchingEmbeddings(
+                embeddings,
+                max_batch_size=Config.EMBEDDING_BATCH_MAX_SIZE,
+                max_wait_ms=Config.EMBEDDING_BATCH_MAX_WAIT_MS,
+            )
+            self._embedding_batcher = embeddings
+
+        if not Config.EMBEDDING_CACHE_ENABLED:
+            return embeddings
+        return CachedEmbeddings(
+            embeddings,
+            model_name=model_name,
+            path=os.path.join(Config.CACHE_DIR, "embeddings.sqlite3"),
+            max_entries=Config.EMBEDDING_CACHE_SIZE,
+            max_bytes=int(Config.EMBEDDING_CACHE_MEMORY_MB * 1024 * 1024),
+        )
+
+    # --- Lifecycle ------------------------------------------------------
+
+    def startup(self):
+        """Creates the clients up front so the first request doesn't pay for it."""
+        self.llm()
+        self.embeddings()
+        self.vector_store()
+
+    async def shutdown(self):
+        """Closes Milvus channels and HTTP pools."""
+        with self._lock:
+            stores = list(self._vector_stores.values())
+            self._vector_stores = {}
+            self._llm = None
+            embeddings, self._embeddings = self._embeddings, None
+            self._embedding_batcher = None
+            http_client, http_async_client = self._http_client, self._http_async_client
+            self._http_client = self._http_async_client = None
+            milvus_alias, self._milvus_alias = self._milvus_alias, None
+
+        for store in stores:
+            try:
+                if isinstance(store, LocalVectorStore):
+                    store.persist()
+                else:
+                    store.client.close()
+            except Exception as e:
+                logger.warning("Error closing vector store client: %s", e)
+
+        if milvus_alias:
+            connections.disconnect(milvus_alias)
+
+        if isinstance(embeddings, CachedEmbeddings):
+            embeddings.close()
+
+        if http_async_client is not None:
+            await http_async_client.aclose()
+        if http_client is not None:
+            http_client.close()
+
+    def stats(self):
+        """Per-client usage counters."""
+        with self._lock:
+            stats = {
+                "usage": dict(self.usage),
+                "vector_stores": list(self._vector_stores),
+                "llm_ready": self._llm is not None,
+                "embeddings_ready": self._embeddings is not None,
+            }
+            if isinstance(self._embeddings, CachedEmbeddings):
+                stats["embedding_cache"] = self._embeddings.stats()
+            if self._embedding_batcher is not None:
+                stats["embedding_batcher"] = self._embedding_batcher.stats()
+            return stats
+
+
+# Global instance
+clients = ClientRegistry()
+
 
 def get_llm():
     """Returns the configured LLM instance."""
-    if Config.MODEL_PROVIDER == "openai":
-        return ChatOpenAI(
-            model=Config.OPENAI_LLM_MODEL,
-            api_key=Config.OPENAI_API_KEY,
-            temperature=0
-        )
-    else:
-        raise ValueError(f"Unsupported provider: {Config.MODEL_PROVIDER}")
+    return clients.llm()
 
 def get_embeddings():
     """Returns the configured Embeddings model instance."""
-    if Config.MODEL_PROVIDER == "openai":
-        return OpenAIEmbeddings(
-            model=Config.OPENAI_EMBEDDING_MODEL,
-            api_key=Config.OPENAI_API_KEY
-        )
-    else:
-        raise ValueError(f"Unsupported provider: {Config.MODEL_PROVIDER}")
+    return clients.embeddings()
+
+def get_vector_store(collection_name=None):
+    """Returns the shared vector store for a collection."""
+    return clients.vector_store(collection_name)
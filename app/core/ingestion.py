@@ -0,0 +1,673 @@
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pymilvus import MilvusException
+from pypdf import PdfReader
+
+from app.core.config import Config
+from app.core.corpus import corpus_state
+from app.core.factory import get_embeddings, get_vector_store
+from app.core.lexical_index import lexical_index
+from app.core.local_vector_store import LocalVectorStore
+from app.core.milvus_executor import milvus_executor
+from app.core.parse_cache import parse_cache
+from app.core.utils import count_tokens, quote_expr
+
+logger = logging.getLogger(__name__)
+
+# Metadata fields every chunk carries, so rows line up with strict schemas
+_STRING_FIELDS = ["producer", "creator", "creationdate", "author", "moddate", "subject", "title", "trapped", "page_label"]
+
+
+def collect_pdf_files(file_path: str = None, directories: List[str] = ()) -> List[str]:
+    """Returns the PDF at `file_path` (if it exists) plus every PDF under `directories`."""
+    pdf_files = []
+    if file_path and os.path.exists(file_path):
+        pdf_files.append(file_path)
+    for directory in directories:
+        if os.path.exists(directory):
+            for root, _, files in os.walk(directory):
+                for file in files:
+                    if file.lower().endswith(".pdf"):
+                        pdf_files.append(os.path.join(root, file))
+    return pdf_files
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_pdf(pdf_path: str) -> List[Document]:
+    """Parses a PDF into per-page documents. Runs in a worker process."""
+    return PyPDFLoader(pdf_path).load()
+
+
+def iter_pdf_pages(stream: BinaryIO, source: str) -> Iterator[Document]:
+    """
+    Lazily yields one document per page of a PDF read from a file object, so
+    only the page being processed has its text in memory.
+    """
+    reader = PdfReader(stream)
+    info = {}
+    for key, value in (reader.metadata or {}).items():
+        field = key.lstrip("/").lower()
+        if field in _STRING_FIELDS:
+            info[field] = str(value)
+    total_pages = len(reader.pages)
+    labels = reader.page_labels
+    for page_number in range(total_pages):
+        yield Document(
+            page_content=reader.pages[page_number].extract_text() or "",
+            metadata={
+                **info,
+                "source": source,
+                "total_pages": total_pages,
+                "page": page_number,
+                "page_label": labels[page_number] if page_number < len(labels) else str(page_number + 1),
+            }
+        )
+
+
+class IngestionProgress:
+    """Per-file status and throughput counters for one ingestion run."""
+
+    def __init__(self, pdf_files: List[str] = ()):
+        self.files = {path: {"status": "pending", "chunks": 0, "error": None} for path in pdf_files}
+        self.started_at = None
+        self.finished_at = None
+        self.chunks_embedded = 0
+        self.tokens_embedded = 0
+        self.embed_seconds = 0.0
+
+    def file_status(self, path: str, status: str, chunks: int = None, error: str = None):
+        entry = self.files.setdefault(path, {"status": "pending", "chunks": 0, "error": None})
+        entry["status"] = status
+        if chunks is not None:
+            entry["chunks"] = chunks
+        if error is not None:
+            entry["error"] = error
+
+    def embedded(self, chunks: int, tokens: int, seconds: float):
+        self.chunks_embedded += chunks
+        self.tokens_embedded += tokens
+        self.embed_seconds += seconds
+
+    @property
+    def errors(self) -> List[Dict]:
+        return [{"file": path, "error": entry["error"]} for path, entry in self.files.items() if entry["error"]]
+
+    def throughput(self) -> Dict:
+        if self.started_at is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "chunks_per_second": round(self.chunks_embedded / elapsed, 2) if elapsed else 0.0,
+            "embed_tokens_per_second": round(self.tokens_embedded / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+def scan_chunks(vector_store, fields: List[str], batch_size: int = 1000) -> Iterator[List[Document]]:
+    """Blocking: every stored chunk's text plus the given fields, in batches."""
+    if isinstance(vector_store, LocalVectorStore):
+        docs = vector_store.search_by_metadata("", fields=fields, limit=vector_store.count())
+        for start in range(0, len(docs), batch_size):
+            yield docs[start:start + batch_size]
+        return
+    if vector_store.col is None:
+        return
+    text_field = vector_store._text_field
+    iterator = vector_store.col.query_iterator(batch_size=batch_size, expr="", output_fields=[text_field] + fields)
+    try:
+        while rows := iterator.next():
+            yield [Document(page_content=row.pop(text_field, ""), metadata=row) for row in rows]
+    finally:
+        iterator.close()
+
+
+def corpus_digest(vector_store) -> str:
+    """
+    Blocking: digest over every stored chunk's source and text hash, in a
+    fixed order, so the same content always gives the same corpus version.
+    """
+    entries = []
+    for docs in scan_chunks(vector_store, ["source"]):
+        entries.extend((doc.metadata.get("source") or "", chunk_sha256(doc.page_content)) for doc in docs)
+    digest = hashlib.sha256()
+    for source, chunk_hash in sorted(entries):
+        digest.update(f"{source}:{chunk_hash}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def rebuild_lexical_index(vector_store) -> int:
+    """Blocking: indexes every stored chunk lexically and persists the index. Returns the chunk count."""
+    for docs in scan_chunks(vector_store, ["source", "page", "page_label", "chunk_hash"]):
+        lexical_index.add(
+            Document(page_content=doc.page_content, metadata={
+                **doc.metadata,
+                # Chunks stored before chunk hashes were recorded
+                "chunk_hash": doc.metadata.get("chunk_hash") or chunk_sha256(doc.page_content),
+            })
+            for doc in docs
+        )
+    lexical_index.persist()
+    return lexical_index.count()
+
+
+async def restore_lexical_index(vector_store=None):
+    """
+    Rebuilds the lexical index from the vector store when hybrid retrieval
+    is on and the index is empty (CACHE_DIR is not kept across redeploys).
+    Until it is rebuilt, retrieval stays dense.
+    """
+    if Config.RETRIEVAL_MODE != "hybrid" or lexical_index.count():
+        return
+    try:
+        vector_store = vector_store or await milvus_executor.run(get_vector_store)
+        if vector_store is None:
+            raise RuntimeError("Vector store not configured")
+        started = time.perf_counter()
+        count = await milvus_executor.run(rebuild_lexical_index, vector_store)
+        logger.info("Rebuilt lexical index from %d stored chunks in %.2fs", count, time.perf_counter() - started)
+    except Exception as e:
+        logger.warning("Could not rebuild the lexical index, hybrid retrieval falls back to dense until the next ingest: %s", e)
+
+
+async def sync_corpus_version(vector_store=None, fingerprint: str = None):
+    """
+    Derives the corpus version from the stored chunks (at startup, and after
+    an ingest changed them). If the store can't be read, an ingest still
+    advances the version by chaining its change `fingerprint`; at startup
+    the version is left as it was.
+    """
+    try:
+        vector_store = vector_store or await milvus_executor.run(get_vector_store)
+        if vector_store is None:
+            raise RuntimeError("Vector store not configured")
+        digest = await milvus_executor.run(corpus_digest, vector_store)
+    except Exception as e:
+        if fingerprint is not None:
+            logger.warning("Could not derive the corpus version, advancing it from the change: %s", e)
+            corpus_state.bump(fingerprint)
+        else:
+            logger.warning("Could not derive the corpus version: %s", e)
+        return
+    corpus_state.set_content(digest)
+
+
+class IngestionPipeline:
+    """
+    Staged, incremental PDF ingestion.
+
+    walk -> hash files -> parse changed files in a process pool -> split ->
+    hash chunks -> diff against chunks already stored for that source ->
+    batch-embed -> insert in fixed-size batches, plus deletion of chunks from
+    changed or vanished files. Each chunk carries `chunk_hash` and `file_hash`
+    metadata, so an unchanged file is recognised without being parsed.
+    """
+
+    def __init__(self, batch_size: int, workers: int):
+        self.batch_size = batch_size
+        self.workers = workers
+        self._process_pool = None
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+
+    def _get_process_pool(self):
+        if self._process_pool is None:
+            # Forking a process that already runs gRPC / httpx threads can
+            # deadlock the child, so workers start from a clean interpreter
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_pool
+
+    def shutdown(self):
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+    # --- Stages ---------------------------------------------------------
+
+    def split(self, pdf_path: str, file_hash: str, docs: List[Document]) -> List[Document]:
+        """Splits pages into chunks, fills metadata defaults and stamps hashes."""
+        splits = self.splitter.split_documents(docs)
+        for split in splits:
+            split.metadata.setdefault("keywords", "portfolio")
+            split.metadata.setdefault("source", pdf_path)
+            for field in _STRING_FIELDS:
+                split.metadata.setdefault(field, "")
+            split.metadata.setdefault("total_pages", 0)
+            split.metadata.setdefault("page", 0)
+            split.metadata["file_hash"] = file_hash
+            split.metadata["chunk_hash"] = chunk_sha256(split.page_content)
+        return splits
+
+    async def _parse(self, pdf_path: str) -> List[Document]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_process_pool(), load_pdf, pdf_path)
+
+    async def _load(self, pdf_path: str, file_hash: str):
+        """Pages of a PDF from the parse cache, else parsed and cached. Returns (pages, reused)."""
+        docs = await asyncio.to_thread(parse_cache.get_pages, file_hash, pdf_path)
+        if docs is not None:
+            return docs, True
+        docs = await self._parse(pdf_path)
+        await asyncio.to_thread(parse_cache.put_pages, file_hash, docs)
+        await asyncio.to_thread(parse_cache.complete, file_hash, len(docs))
+        return docs, False
+
+    @staticmethod
+    def _unchanged(rows: List[Dict], file_hash: str, ingested_hash: Optional[str]) -> bool:
+        """
+        Whether a source's stored chunks are current. Chunks kept across an
+        edit keep the hash they were inserted with, so the recorded ingest
+        hash is checked first; without a record every row must match.
+        """
+        if not rows:
+            return False
+        return ingested_hash == file_hash or all(row.get("file_hash") == file_hash for row in rows)
+
+    @staticmethod
+    def _report(files: int) -> Dict:
+        """Empty per-stage counters shared by run and run_stream."""
+        return {
+            "files": files,
+            "unchanged_files": 0,
+            "parsed_files": 0,
+            "failed_files": 0,
+            "removed_files": 0,
+            "added_chunks": 0,
+            "deleted_chunks": 0,
+            "unchanged_chunks": 0,
+            "reused_pages": 0,
+            "parsed_pages": 0,
+        }
+
+    @staticmethod
+    def _query(vector_store, expr: str, fields: List[str]) -> List[Document]:
+        """
+        Blocking: filter-only query returning chunk text plus the given fields.
+
+        Milvus is queried through the pymilvus Collection with explicit output
+        fields, so the text field is always present and schema errors (e.g.
+        fields missing from a legacy collection) surface as MilvusException
+        instead of an empty result.
+        """
+        if isinstance(vector_store, LocalVectorStore):
+            return vector_store.search_by_metadata(expr=expr, fields=fields, limit=16384)
+        if vector_store.col is None:
+            return []
+        text_field = vector_store._text_field
+        primary_field = vector_store._primary_field
+        output_fields = [text_field] + [field for field in fields if field not in ("pk", primary_field)]
+        rows = vector_store.col.query(expr=expr, output_fields=output_fields, limit=16384)
+        docs = []
+        for row in rows:
+            row["pk"] = row.pop(primary_field, row.get("pk"))
+            docs.append(Document(page_content=row.pop(text_field, ""), metadata=row))
+        return docs
+
+    @classmethod
+    def _stored_chunks(cls, vector_store, source: str) -> Optional[List[Document]]:
+        """
+        Blocking: chunks stored for a source, with pk, chunk_hash, file_hash and page metadata.
+
+        Returns:
+            The chunks, or None when the collection cannot report chunk hashes
+            (e.g. a legacy schema without dynamic fields); the caller then
+            replaces the source in full.
+        """
+        try:
+            return cls._query(
+                vector_store, f'source == "{quote_expr(source)}"', ["pk", "chunk_hash", "file_hash", "page"]
+            )
+        except MilvusException as e:
+            logger.warning("Cannot read stored chunk hashes for %s, re-ingesting it in full: %s", source, e)
+            return None
+
+    @classmethod
+    def _stored_sources(cls, vector_store, root: str) -> set:
+        """Blocking: distinct sources stored under a scanned directory (empty if they cannot be listed)."""
+        prefix = os.path.join(root, "")
+        try:
+            docs = cls._query(vector_store, f'source like "{quote_expr(prefix)}%"', ["source"])
+        except MilvusException as e:
+            logger.warning("Cannot list stored sources under %s, skipping stale-file cleanup: %s", root, e)
+            return set()
+        # `%` and `_` in the directory name are LIKE wildcards, so the query
+        # can match more than the directory; keep only real prefix matches
+        return {doc.metadata.get("source") for doc in docs if (doc.metadata.get("source") or "").startswith(prefix)}
+
+    async def _insert(self, vector_store, chunks: List[Document], progress: IngestionProgress):
+        """Embeds and inserts chunks in fixed-size batches."""
+        embeddings = get_embeddings()
+        for start in range(0, len(chunks), self.batch_size):
+            batch = chunks[start:start + self.batch_size]
+            texts = [chunk.page_content for chunk in batch]
+            embed_started = time.perf_counter()
+            vectors = await embeddings.aembed_documents(texts)
+            progress.embedded(
+                len(batch),
+                sum(count_tokens(text, Config.OPENAI_EMBEDDING_MODEL) for text in texts),
+                time.perf_counter() - embed_started
+            )
+            await milvus_executor.run(
+                vector_store.add_embeddings,
+                texts=texts,
+                embeddings=vectors,
+                metadatas=[chunk.metadata for chunk in batch]
+            )
+            lexical_index.add(batch)
+
+    @staticmethod
+    def _backfill_lexical(source: str, stored: List[Document]):
+        """Indexes stored chunks of an unchanged file the lexical index has not seen yet."""
+        if stored and not lexical_index.has_source(source):
+            lexical_index.add(
+                Document(page_content=doc.page_content, metadata={**doc.metadata, "source": source})
+                for doc in stored
+            )
+
+    # --- Pipeline -------------------------------------------------------
+
+    async def run(
+        self,
+        pdf_files: List[str],
+        scan_roots: List[str] = (),
+        progress: IngestionProgress = None
+    ) -> Dict:
+        """
+        Ingests `pdf_files` incrementally.
+
+        Args:
+            pdf_files: PDFs to ingest
+            scan_roots: Directories that were walked; stored chunks whose source
+                under these roots no longer exists are deleted
+            progress: Optional progress tracker updated as files move through stages
+
+        Returns:
+            Report with per-stage counts
+        """
+        progress = progress or IngestionProgress(pdf_files)
+        progress.started_at = time.time()
+        vector_store = await milvus_executor.run(get_vector_store)
+        if not vector_store:
+            raise RuntimeError("Vector store not configured")
+
+        report = self._report(len(pdf_files))
+        fingerprint = hashlib.sha256()
+
+        # 1. Hash files (reusing the hash when size/mtime are unchanged) and
+        # look up what is already stored for each
+        file_hashes = await asyncio.gather(
+            *(asyncio.to_thread(parse_cache.file_hash, path, file_sha256) for path in pdf_files)
+        )
+        stored = await asyncio.gather(
+            *(milvus_executor.run(self._stored_chunks, vector_store, path) for path in pdf_files)
+        )
+        ingested = await asyncio.gather(
+            *(asyncio.to_thread(parse_cache.ingested_hash, path) for path in pdf_files)
+        )
+
+        changed = []
+        replaced = set()
+        for path, file_hash, docs, ingested_hash in zip(pdf_files, file_hashes, stored, ingested):
+            if docs is None:
+                replaced.add(path)
+                docs = []
+            rows = [doc.metadata for doc in docs]
+            if self._unchanged(rows, file_hash, ingested_hash):
+                report["unchanged_files"] += 1
+                report["unchanged_chunks"] += len(rows)
+                progress.file_status(path, "unchanged", chunks=len(rows))
+                self._backfill_lexical(path, docs)
+            else:
+                changed.append((path, file_hash, rows))
+                progress.file_status(path, "parsing")
+
+        # 2. Parse changed files in parallel worker processes, unless their
+        # pages are in the parse cache; a bad file fails on its own without
+        # aborting the rest.
+        parsed = await asyncio.gather(
+            *(self._load(path, file_hash) for path, file_hash, _ in changed), return_exceptions=True
+        )
+
+        to_insert = []
+        to_delete = []
+        lexical_removed = []
+        for (path, file_hash, rows), result in zip(changed, parsed):
+            if isinstance(result, Exception):
+                report["failed_files"] += 1
+                progress.file_status(path, "failed", error=str(result))
+                continue
+            docs, reused = result
+            report["parsed_files"] += 1
+            report["reused_pages" if reused else "parsed_pages"] += len(docs)
+
+            # 3. Split and hash, then diff against the stored chunk hashes
+            splits = await asyncio.to_thread(self.split, path, file_hash, docs)
+            stored_hashes = {}
+            for row in rows:
+                stored_hashes.setdefault(row.get("chunk_hash"), []).append(row["pk"])
+
+            new_hashes = set()
+            for split in splits:
+                chunk_hash = split.metadata["chunk_hash"]
+                if chunk_hash in new_hashes:
+                    continue
+                new_hashes.add(chunk_hash)
+                if chunk_hash in stored_hashes:
+                    report["unchanged_chunks"] += 1
+                else:
+                    to_insert.append(split)
+                    fingerprint.update(f"+{path}:{chunk_hash}".encode("utf-8"))
+
+            for chunk_hash, pks in stored_hashes.items():
+                if chunk_hash not in new_hashes:
+                    to_delete.extend(pks)
+                    lexical_removed.append((path, chunk_hash))
+                    fingerprint.update(f"-{path}:{chunk_hash}".encode("utf-8"))
+            progress.file_status(path, "embedding", chunks=len(new_hashes))
+            # Chunks kept from a previous version stay searchable lexically
+            self._backfill_lexical(
+                path, [Document(page_content=split.page_content, metadata=split.metadata) for split in splits
+                       if split.metadata["chunk_hash"] in stored_hashes]
+            )
+
+        # 4. Chunks from files that disappeared from the scanned directories
+        vanished = set()
+        for root in scan_roots:
+            sources = await milvus_executor.run(self._stored_sources, vector_store, root)
+            vanished |= {source for source in sources if source and not os.path.exists(source)}
+
+        # 5. Apply: delete stale chunks, then embed + insert new ones in batches.
+        # The corpus version is bumped even if the run is cancelled part-way,
+        # since some changes may already be visible.
+        try:
+            for source in sorted(vanished):
+                await milvus_executor.run(vector_store.delete, expr=f'source == "{quote_expr(source)}"')
+                lexical_index.remove_source(source)
+                fingerprint.update(f"-{source}".encode("utf-8"))
+                report["removed_files"] += 1
+            # Sources whose stored chunks could not be diffed are replaced whole
+            for source in sorted(replaced):
+                await milvus_executor.run(vector_store.delete, expr=f'source == "{quote_expr(source)}"')
+                lexical_index.remove_source(source)
+                fingerprint.update(f"-{source}".encode("utf-8"))
+            if to_delete:
+                await milvus_executor.run(vector_store.delete, ids=to_delete)
+                lexical_index.remove(lexical_removed)
+                report["deleted_chunks"] = len(to_delete)
+            await self._insert(vector_store, to_insert, progress)
+            report["added_chunks"] = len(to_insert)
+        finally:
+            if to_insert or to_delete or vanished or replaced:
+                # New content invalidates cached answers built from the old corpus
+                await sync_corpus_version(vector_store, fingerprint.hexdigest())
+            await asyncio.to_thread(lexical_index.persist)
+
+        # Record the hash every applied file was ingested at, so files whose
+        # kept chunks carry an older hash still take the unchanged path
+        applied = {path: file_hash for path, file_hash in zip(pdf_files, file_hashes)
+                   if progress.files[path]["status"] in ("embedding", "unchanged")}
+        applied.update({source: None for source in vanished})
+        await asyncio.to_thread(parse_cache.record_ingested, applied)
+
+        for path, entry in progress.files.items():
+            if entry["status"] == "embedding":
+                progress.file_status(path, "done")
+
+        progress.finished_at = time.time()
+        report.update(progress.throughput())
+        logger.info("Ingestion finished: %s", report)
+        return report
+
+
+    async def run_stream(self, stream: BinaryIO, source: str, progress: IngestionProgress = None) -> Dict:
+        """
+        Ingests one PDF from a file object (e.g. an upload) page by page.
+
+        Pages are parsed, split and hashed one at a time and new chunks are
+        embedded and inserted whenever `batch_size` of them are waiting, so
+        memory stays bounded by a batch rather than the document.
+
+        Args:
+            stream: Seekable binary file object holding the PDF
+            source: Name stored as the chunks' `source` metadata
+            progress: Optional progress tracker
+
+        Returns:
+            Report with per-stage counts
+        """
+        progress = progress or IngestionProgress([source])
+        progress.started_at = time.time()
+        vector_store = await milvus_executor.run(get_vector_store)
+        if not vector_store:
+            raise RuntimeError("Vector store not configured")
+
+        report = self._report(1)
+        fingerprint = hashlib.sha256()
+
+        def stream_sha256():
+            digest = hashlib.sha256()
+            stream.seek(0)
+            for block in iter(lambda: stream.read(1024 * 1024), b""):
+                digest.update(block)
+            stream.seek(0)
+            return digest.hexdigest()
+
+        file_hash = await asyncio.to_thread(stream_sha256)
+        stored = await milvus_executor.run(self._stored_chunks, vector_store, source)
+        if stored is None:
+            # Cannot diff against what is stored, so replace the source whole
+            await milvus_executor.run(vector_store.delete, expr=f'source == "{quote_expr(source)}"')
+            lexical_index.remove_source(source)
+            fingerprint.update(f"-{source}".encode("utf-8"))
+            stored = []
+        rows = [doc.metadata for doc in stored]
+        ingested_hash = await asyncio.to_thread(parse_cache.ingested_hash, source)
+        if self._unchanged(rows, file_hash, ingested_hash):
+            report["unchanged_files"] = 1
+            report["unchanged_chunks"] = len(rows)
+            progress.file_status(source, "unchanged", chunks=len(rows))
+            self._backfill_lexical(source, stored)
+        else:
+            stored_hashes = {}
+            for row in rows:
+                stored_hashes.setdefault(row.get("chunk_hash"), []).append(row["pk"])
+            seen = set()
+            pending = []
+            to_delete = []
+            progress.file_status(source, "parsing")
+            try:
+                # Only reached once the file hash showed a change. Cached pages
+                # are read one at a time too, so a cache hit keeps the same
+                # memory bound as parsing.
+                cached = await asyncio.to_thread(parse_cache.page_count, file_hash)
+                if cached is not None:
+                    pages = (parse_cache.get_page(file_hash, number, source) for number in range(cached))
+                else:
+                    pages = iter_pdf_pages(stream, source)
+                while True:
+                    page = await asyncio.to_thread(next, pages, None)
+                    if page is None:
+                        break
+                    if cached is not None:
+                        report["reused_pages"] += 1
+                    else:
+                        report["parsed_pages"] += 1
+                        await asyncio.to_thread(
+                            parse_cache.put_pages, file_hash, [page], page.metadata["page"]
+                        )
+                    for split in self.split(source, file_hash, [page]):
+                        chunk_hash = split.metadata["chunk_hash"]
+                        if chunk_hash in seen:
+                            continue
+                        seen.add(chunk_hash)
+                        if chunk_hash in stored_hashes:
+                            report["unchanged_chunks"] += 1
+                            lexical_index.add([split])
+                        else:
+                            pending.append(split)
+                            fingerprint.update(f"+{source}:{chunk_hash}".encode("utf-8"))
+                    if len(pending) >= self.batch_size:
+                        progress.file_status(source, "embedding", chunks=len(seen))
+                        await self._insert(vector_store, pending, progress)
+                        report["added_chunks"] += len(pending)
+                        pending = []
+                await self._insert(vector_store, pending, progress)
+                report["added_chunks"] += len(pending)
+                report["parsed_files"] = 1
+                if cached is None:
+                    await asyncio.to_thread(parse_cache.complete, file_hash, report["parsed_pages"])
+
+                # Chunks of the previous version of this document that are gone
+                for chunk_hash, pks in stored_hashes.items():
+                    if chunk_hash not in seen:
+                        to_delete.extend(pks)
+                        fingerprint.update(f"-{source}:{chunk_hash}".encode("utf-8"))
+                if to_delete:
+                    await milvus_executor.run(vector_store.delete, ids=to_delete)
+                    lexical_index.remove((source, chunk_hash) for chunk_hash in stored_hashes if chunk_hash not in seen)
+                    report["deleted_chunks"] = len(to_delete)
+                progress.file_status(source, "done", chunks=len(seen))
+                await asyncio.to_thread(parse_cache.record_ingested, {source: file_hash})
+            except Exception as e:
+                report["failed_files"] = 1
+                progress.file_status(source, "failed", error=str(e))
+                raise
+            finally:
+                if report["added_chunks"] or report["deleted_chunks"]:
+                    await sync_corpus_version(vector_store, fingerprint.hexdigest())
+        await asyncio.to_thread(lexical_index.persist)
+
+        progress.finished_at = time.time()
+        report.update(progress.throughput())
+        logger.info("Ingestion finished: %s", report)
+        return report
+
+
+# Global instance
+ingestion_pipeline = IngestionPipeline(
+    batch_size=Config.INGEST_BATCH_SIZE,
+    workers=Config.INGEST_WORKERS,
+)
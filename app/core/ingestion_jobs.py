@@ -0,0 +1,137 @@
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import BinaryIO, Dict, List, Optional
+
+from app.core.config import Config
+from app.core.ingestion import IngestionProgress, ingestion_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionJob:
+    """One background ingestion run and its progress."""
+
+    def __init__(self, pdf_files: List[str], run):
+        self.id = uuid.uuid4().hex
+        self.pdf_files = pdf_files
+        # Coroutine function taking the job's progress tracker
+        self.run = run
+        self.status = "queued"
+        self.created_at = time.time()
+        self.progress = IngestionProgress(pdf_files)
+        self.report = None
+        self.error = None
+        self.task = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def as_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": int(self.created_at),
+            "files": self.progress.files,
+            "errors": self.progress.errors,
+            "chunks_embedded": self.progress.chunks_embedded,
+            "tokens_embedded": self.progress.tokens_embedded,
+            **self.progress.throughput(),
+            "report": self.report,
+            "error": self.error,
+        }
+
+
+class IngestionJobManager:
+    """
+    Runs ingestion as background asyncio tasks so POST /ingest returns at once.
+
+    Jobs run one at a time (they share the process pool and write the same
+    collection). Finished jobs are kept for status polling up to
+    `history_size`, oldest evicted first.
+    """
+
+    def __init__(self, history_size: int):
+        self.history_size = history_size
+        self._jobs = OrderedDict()
+        self._lock = None
+
+    def _start(self, job: IngestionJob, cleanup=None) -> IngestionJob:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        job.task = asyncio.create_task(self._run(job, cleanup), name=f"ingest-{job.id}")
+        self._jobs[job.id] = job
+        self._evict()
+        return job
+
+    def submit(self, pdf_files: List[str], scan_roots: List[str] = ()) -> IngestionJob:
+        """Creates a job for server-side files and starts it on the running event loop."""
+        scan_roots = list(scan_roots)
+        return self._start(IngestionJob(
+            pdf_files,
+            lambda progress: ingestion_pipeline.run(pdf_files, scan_roots=scan_roots, progress=progress)
+        ))
+
+    def submit_stream(self, stream: BinaryIO, source: str) -> IngestionJob:
+        """Creates a job ingesting an uploaded PDF; the job closes `stream` when done."""
+        return self._start(
+            IngestionJob(
+                [source],
+                lambda progress: ingestion_pipeline.run_stream(stream, source, progress=progress)
+            ),
+            cleanup=stream.close
+        )
+
+    async def _run(self, job: IngestionJob, cleanup=None):
+        try:
+            async with self._lock:
+                job.status = "running"
+                job.report = await job.run(job.progress)
+            job.status = "failed" if job.report["failed_files"] == len(job.pdf_files) else "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            logger.info("Ingestion job %s cancelled", job.id)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error("Ingestion job %s failed: %s", job.id, e)
+        finally:
+            job.progress.finished_at = job.progress.finished_at or time.time()
+            if cleanup is not None:
+                cleanup()
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        while len(self._jobs) > self.history_size and finished:
+            del self._jobs[finished.pop(0)]
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        """Requests cancellation; the corpus version still reflects partial writes."""
+        job = self._jobs.get(job_id)
+        if job is not None and not job.finished:
+            job.task.cancel()
+        return job
+
+    async def shutdown(self):
+        """Cancels unfinished jobs and waits for them to unwind."""
+        tasks = [job.task for job in self._jobs.values() if not job.finished]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self):
+        counts = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+
+# Global instance
+ingestion_jobs = IngestionJobManager(history_size=Config.INGEST_JOB_HISTORY)
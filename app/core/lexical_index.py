@@ -0,0 +1,212 @@
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from langchain_core.documents import Document
+
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Keeps tokens like "c++", "c#", "node.js", "2021-2023" intact
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#._\-]*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from has have how i in is it its me my "
+    "of on or our so that the their them they this to was we were what when where which "
+    "who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        token = token.rstrip("._-")
+        if token and token not in _STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    In-process BM25 inverted index over the portfolio chunks.
+
+    Entries are keyed by (source, chunk_hash) and added / removed by the
+    ingestion pipeline alongside the vector store writes. Only the chunk
+    texts and metadata are persisted (JSON under CACHE_DIR); postings are
+    rebuilt on load, which takes milliseconds at portfolio scale.
+    """
+
+    def __init__(self, path: str = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._lengths = {}
+        self._postings = defaultdict(dict)
+        self._total_length = 0
+        self._dirty = False
+        self.searches = 0
+        self.total_search_ms = 0.0
+        self._load()
+
+    @staticmethod
+    def _key(source: str, chunk_hash: str) -> str:
+        return f"{source}#{chunk_hash}"
+
+    # --- Persistence ----------------------------------------------------
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning("Could not read lexical index: %s", e)
+            return
+        for key, entry in entries.items():
+            self._index(key, entry["text"], entry["metadata"])
+        self._dirty = False
+
+    def persist(self):
+        """Writes the index to disk if it changed. Blocking."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = {key: {"text": text, "metadata": metadata} for key, (text, metadata) in self._docs.items()}
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning("Could not persist lexical index: %s", e)
+
+    # --- Updates --------------------------------------------------------
+
+    def _index(self, key: str, text: str, metadata: Dict):
+        self._unindex(key)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self._postings[term][key] = tf
+        length = sum(counts.values())
+        self._docs[key] = (text, metadata)
+        self._lengths[key] = length
+        self._total_length += length
+        self._dirty = True
+
+    def _unindex(self, key: str):
+        entry = self._docs.pop(key, None)
+        if entry is None:
+            return
+        for term in set(tokenize(entry[0])):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(key, 0)
+        self._dirty = True
+
+    def add(self, docs: Iterable[Document]):
+        """Indexes chunks carrying `source` and `chunk_hash` metadata."""
+        with self._lock:
+            for doc in docs:
+                metadata = {
+                    key: doc.metadata.get(key)
+                    for key in ("source", "page", "page_label", "chunk_hash")
+                    if doc.metadata.get(key) is not None
+                }
+                self._index(self._key(metadata.get("source", ""), metadata.get("chunk_hash", "")), doc.page_content, metadata)
+
+    def remove(self, chunks: Iterable[Tuple[str, str]]):
+        """Removes (source, chunk_hash) pairs."""
+        with self._lock:
+            for source, chunk_hash in chunks:
+                self._unindex(self._key(source, chunk_hash))
+
+    def remove_source(self, source: str):
+        prefix = f"{source}#"
+        with self._lock:
+            for key in [key for key in self._docs if key.startswith(prefix)]:
+                self._unindex(key)
+
+    def has_source(self, source: str) -> bool:
+        prefix = f"{source}#"
+        with self._lock:
+            return any(key.startswith(prefix) for key in self._docs)
+
+    # --- Search ---------------------------------------------------------
+
+    def search(self, query: str, k: int = 6) -> List[Tuple[Document, float]]:
+        """Top-k chunks by BM25 score."""
+        started = time.perf_counter()
+        with self._lock:
+            n = len(self._docs)
+            if not n:
+                return []
+            avg_length = self._total_length / n
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[key] / avg_length)
+                    scores[key] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            results = [
+                (Document(page_content=self._docs[key][0], metadata=dict(self._docs[key][1])), score)
+                for key, score in top
+            ]
+        self.searches += 1
+        self.total_search_ms += (time.perf_counter() - started) * 1000
+        return results
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._docs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": len(self._docs),
+                "terms": len(self._postings),
+                "searches": self.searches,
+                "avg_search_ms": round(self.total_search_ms / self.searches, 3) if self.searches else 0.0,
+            }
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 60, limit: int = 6) -> List[Document]:
+    """
+    Fuses ranked lists with RRF: score(d) = sum over lists of 1 / (k + rank).
+    Documents are matched across lists by their text.
+    """
+    scores = {}
+    docs = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            scores[doc.page_content] = scores.get(doc.page_content, 0.0) + 1.0 / (k + rank)
+            docs.setdefault(doc.page_content, doc)
+    ordered = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [docs[text] for text in ordered]
+
+
+# Global instance (indexes the portfolio collection)
+lexical_index = LexicalIndex(os.path.join(Config.CACHE_DIR, "lexical", f"{Config.COLLECTION_NAME}.json"))
@@ -0,0 +1,478 @@
+
+import ast
+import json
+import logging
+import operator
+import os
+import re
+import threading
+import time
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+_STRING = r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\''
+# Quoted strings (and lists of them) are single tokens, so keywords and
+# operators inside a value never split the expression
+_TOKEN = re.compile(
+    r"\s*(?:"
+    rf"(?P<string>{_STRING})"
+    rf"|(?P<list>\[(?:{_STRING}|[^\]\"'])*\])"
+    r"|(?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)"
+    r"|(?P<op>==|!=|<=|>=|<|>|&&|\|\|)"
+    r"|(?P<paren>[()])"
+    r"|(?P<word>\w+)"
+    r")"
+)
+_KEYWORDS = {"and": "and", "&&": "and", "or": "or", "||": "or"}
+_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def _tokenize(expr: str) -> List[Tuple[str, str]]:
+    """Splits a filter expression into (kind, text) tokens."""
+    tokens = []
+    position = 0
+    expr = expr.rstrip()
+    while position < len(expr):
+        match = _TOKEN.match(expr, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Unsupported filter expression: {expr} (at {expr[position:]!r})")
+        kind = match.lastgroup
+        text = match.group(kind)
+        keyword = _KEYWORDS.get(text.lower() if kind == "word" else text)
+        if keyword and kind in ("word", "op"):
+            kind, text = "keyword", keyword
+        tokens.append((kind, text))
+        position = match.end()
+    return tokens
+
+
+def mmr_select(query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """
+    Maximal marginal relevance over L2-normalized rows.
+
+    Greedily picks the row maximising
+    `lambda_mult * sim(query, row) - (1 - lambda_mult) * max sim(row, picked)`,
+    keeping the running max similarity to the picked set as one vector so
+    each step is a single matrix-vector product.
+
+    Returns:
+        Indices into `candidates`, in pick order
+    """
+    if not len(candidates) or k <= 0:
+        return []
+    relevance = candidates @ query
+    first = int(np.argmax(relevance))
+    selected = [first]
+    max_similarity = candidates @ candidates[first]
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        max_similarity = np.maximum(max_similarity, candidates @ candidates[pick])
+    return selected
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store for small corpora.
+
+    Vectors are L2-normalized rows of one contiguous NumPy matrix (float32, or
+    float16 to halve memory) and searched with a brute-force cosine top-k in
+    fixed-size blocks. Texts and metadata are kept column-wise. The store is
+    snapshotted to `<persist_dir>/<collection>.npy` plus a JSON sidecar, and
+    the matrix is memory-mapped on load.
+
+    Filters use the subset of Milvus boolean expressions the app relies on
+    (`==`, `!=`, `<`, `<=`, `>`, `>=`, `in`, `not in`, `like "prefix%"`,
+    joined with `and` / `or`), so callers stay backend-agnostic.
+    """
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        collection_name: str,
+        persist_dir: Optional[str] = None,
+        dtype: str = "float32",
+        persist_interval: float = 5.0,
+        block_size: int = 65536,
+    ):
+        self.embedding_function = embedding_function
+        self.collection_name = collection_name
+        self.persist_dir = persist_dir
+        self.dtype = np.dtype(dtype)
+        self.persist_interval = persist_interval
+        self.block_size = block_size
+        self._lock = threading.RLock()
+        self._vectors = None
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._texts = []
+        self._columns = {}
+        self._next_id = 1
+        self._dirty = False
+        self._last_persist = 0.0
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    def count(self) -> int:
+        """Number of stored rows. (Deliberately not __len__: an empty store must stay truthy.)"""
+        return len(self._ids)
+
+    # --- Persistence ----------------------------------------------------
+
+    def _paths(self):
+        base = os.path.join(self.persist_dir, self.collection_name)
+        return f"{base}.npy", f"{base}.ids.npy", f"{base}.meta.json"
+
+    def _load(self):
+        if not self.persist_dir:
+            return
+        vectors_path, ids_path, meta_path = self._paths()
+        if not os.path.exists(meta_path):
+            return
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self._vectors = np.load(vectors_path, mmap_mode="r")
+            if self._vectors.dtype != self.dtype:
+                # Snapshot written with another precision; convert once in memory
+                self._vectors = np.asarray(self._vectors, dtype=self.dtype)
+            self._ids = np.load(ids_path)
+            self._texts = meta["texts"]
+            self._columns = {
+                name: np.array(values, dtype=object) for name, values in meta["columns"].items()
+            }
+            self._next_id = meta["next_id"]
+            logger.info("Loaded local vector store %s (%d rows)", self.collection_name, len(self._ids))
+        except Exception as e:
+            logger.warning("Could not load local vector store snapshot %s: %s", self.collection_name, e)
+
+    def persist(self):
+        """Writes an atomic snapshot of the store if it changed."""
+        if not self.persist_dir:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.persist_dir, exist_ok=True)
+            vectors_path, ids_path, meta_path = self._paths()
+            dims = self._vectors.shape[1] if self._vectors is not None else 0
+            vectors = self._vectors if self._vectors is not None else np.zeros((0, dims), dtype=self.dtype)
+            for path, array in ((vectors_path, vectors), (ids_path, self._ids)):
+                with open(f"{path}.tmp", "wb") as f:
+                    np.save(f, array)
+                os.replace(f"{path}.tmp", path)
+            meta = {
+                "texts": self._texts,
+                "columns": {name: column.tolist() for name, column in self._columns.items()},
+                "next_id": self._next_id,
+                "dtype": self.dtype.name,
+            }
+            with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(f"{meta_path}.tmp", meta_path)
+            self._dirty = False
+            self._last_persist = time.monotonic()
+
+    def _changed(self):
+        self._dirty = True
+        if time.monotonic() - self._last_persist >= self.persist_interval:
+            self.persist()
+
+    # --- Writes ---------------------------------------------------------
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        embeddings = self.embedding_function.embed_documents(texts)
+        return self.add_embeddings(texts, embeddings, metadatas)
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Adds pre-computed embeddings; returns the assigned ids."""
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = (matrix / np.maximum(norms, 1e-12)).astype(self.dtype)
+
+        with self._lock:
+            count = len(texts)
+            new_ids = np.arange(self._next_id, self._next_id + count, dtype=np.int64)
+            self._next_id += count
+            old_count = len(self._ids)
+
+            if self._vectors is None or len(self._vectors) == 0:
+                self._vectors = matrix
+            else:
+                self._vectors = np.concatenate([self._vectors, matrix])
+            self._ids = np.concatenate([self._ids, new_ids])
+            self._texts.extend(texts)
+
+            fields = set(self._columns) | {key for metadata in metadatas for key in metadata}
+            for field in fields:
+                column = self._columns.get(field)
+                if column is None:
+                    column = np.full(old_count, None, dtype=object)
+                values = np.empty(count, dtype=object)
+                values[:] = [metadata.get(field) for metadata in metadatas]
+                self._columns[field] = np.concatenate([column, values])
+
+            self._changed()
+        return [str(i) for i in new_ids]
+
+    def delete(self, ids: Optional[List] = None, expr: Optional[str] = None, **kwargs: Any) -> Optional[bool]:
+        """Deletes by primary key or by filter expression."""
+        with self._lock:
+            if ids:
+                remove = np.isin(self._ids, np.asarray([int(i) for i in ids], dtype=np.int64))
+            elif expr:
+                remove = self._mask(expr)
+            else:
+                return False
+            if not remove.any():
+                return True
+            keep = ~remove
+            self._vectors = np.asarray(self._vectors)[keep]
+            self._ids = self._ids[keep]
+            self._texts = [text for text, kept in zip(self._texts, keep) if kept]
+            self._columns = {name: column[keep] for name, column in self._columns.items()}
+            self._changed()
+            return True
+
+    # --- Filters --------------------------------------------------------
+
+    def _mask(self, expr: Optional[str]) -> np.ndarray:
+        """
+        Evaluates a Milvus-style filter expression to a row mask.
+
+        Supports comparisons (==, !=, <, <=, >, >=, in, not in, like) joined
+        by and / or (or && / ||), with parentheses.
+
+        Raises:
+            ValueError: If the expression uses unsupported syntax
+        """
+        count = len(self._ids)
+        if not expr or not expr.strip():
+            return np.ones(count, dtype=bool)
+        tokens = _tokenize(expr)
+        mask, position = self._disjunction(tokens, 0, expr)
+        if position != len(tokens):
+            raise ValueError(f"Unsupported filter expression: {expr} (unexpected {tokens[position][1]!r})")
+        return mask
+
+    def _disjunction(self, tokens, position, expr):
+        mask, position = self._conjunction(tokens, position, expr)
+        while position < len(tokens) and tokens[position] == ("keyword", "or"):
+            right, position = self._conjunction(tokens, position + 1, expr)
+            mask = mask | right
+        return mask, position
+
+    def _conjunction(self, tokens, position, expr):
+        mask, position = self._term(tokens, position, expr)
+        while position < len(tokens) and tokens[position] == ("keyword", "and"):
+            right, position = self._term(tokens, position + 1, expr)
+            mask = mask & right
+        return mask, position
+
+    def _term(self, tokens, position, expr):
+        if position < len(tokens) and tokens[position] == ("paren", "("):
+            mask, position = self._disjunction(tokens, position + 1, expr)
+            if position >= len(tokens) or tokens[position] != ("paren", ")"):
+                raise ValueError(f"Unsupported filter expression: {expr} (unbalanced parentheses)")
+            return mask, position + 1
+
+        # field op value, where op may be the two words "not in"
+        field = tokens[position] if position < len(tokens) else None
+        if field is None or field[0] != "word":
+            raise ValueError(f"Unsupported filter expression: {expr} (expected a field name)")
+        position += 1
+        op = tokens[position] if position < len(tokens) else (None, None)
+        if op == ("word", "not") and position + 1 < len(tokens) and tokens[position + 1] == ("word", "in"):
+            op, position = "not in", position + 2
+        elif op[0] == "op" or op in (("word", "in"), ("word", "like")):
+            op, position = op[1], position + 1
+        else:
+            raise ValueError(f"Unsupported filter expression: {expr} (unsupported operator after {field[1]!r})")
+        value = tokens[position] if position < len(tokens) else (None, None)
+        if value[0] not in ("string", "list", "number"):
+            raise ValueError(f"Unsupported filter expression: {expr} (expected a value after {op!r})")
+        if (op in ("in", "not in")) != (value[0] == "list") or (op == "like" and value[0] != "string"):
+            raise ValueError(f"Unsupported filter expression: {expr} (invalid value for {op!r})")
+        try:
+            literal = ast.literal_eval(value[1])
+        except (ValueError, SyntaxError):
+            raise ValueError(f"Unsupported filter expression: {expr} (invalid value {value[1]!r})")
+        return self._compare(field[1], op, literal), position + 1
+
+    def _compare(self, field: str, op: str, value: Any) -> np.ndarray:
+        if field == "pk":
+            column = self._ids.astype(object)
+        else:
+            column = self._columns.get(field)
+            if column is None:
+                return np.zeros(len(self._ids), dtype=bool)
+
+        if op == "in":
+            return np.fromiter((v in value for v in column), dtype=bool, count=len(column))
+        if op == "not in":
+            return np.fromiter((v not in value for v in column), dtype=bool, count=len(column))
+        if op == "like":
+            prefix = value.rstrip("%")
+            return np.fromiter(
+                (isinstance(v, str) and v.startswith(prefix) for v in column), dtype=bool, count=len(column)
+            )
+
+        compare = _OPERATORS[op]
+
+        def safe(v):
+            try:
+                return v is not None and bool(compare(v, value))
+            except TypeError:
+                return False
+
+        return np.fromiter((safe(v) for v in column), dtype=bool, count=len(column))
+
+    # --- Reads ----------------------------------------------------------
+
+    def _row(self, index: int, fields: Optional[List[str]] = None) -> dict:
+        names = fields if fields is not None else list(self._columns)
+        metadata = {name: self._columns[name][index] for name in names if name in self._columns}
+        metadata["pk"] = int(self._ids[index])
+        return metadata
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query against every row, in blocks."""
+        scores = np.empty(len(self._ids), dtype=np.float32)
+        for start in range(0, len(self._ids), self.block_size):
+            block = np.asarray(self._vectors[start:start + self.block_size], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        return scores
+
+    def _normalize(self, embedding: List[float]) -> np.ndarray:
+        query = np.asarray(embedding, dtype=np.float32)
+        return query / max(float(np.linalg.norm(query)), 1e-12)
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, expr: Optional[str] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        with self._lock:
+            if not len(self._ids):
+                return []
+            scores = self._scores(self._normalize(embedding))
+            if expr:
+                scores[~self._mask(expr)] = -np.inf
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (Document(page_content=self._texts[i], metadata=self._row(i)), float(scores[i]))
+                for i in top
+                if np.isfinite(scores[i])
+            ]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, expr: Optional[str] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, expr)]
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        expr: Optional[str] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Top `fetch_k` by cosine similarity, diversified down to `k` with MMR."""
+        with self._lock:
+            if not len(self._ids):
+                return []
+            query = self._normalize(embedding)
+            scores = self._scores(query)
+            if expr:
+                scores[~self._mask(expr)] = -np.inf
+            fetch_k = min(max(fetch_k, k), len(scores))
+            top = np.argpartition(-scores, fetch_k - 1)[:fetch_k]
+            top = top[np.isfinite(scores[top])]
+            candidates = np.asarray(self._vectors[top], dtype=np.float32)
+            picked = mmr_select(query, candidates, k, lambda_mult)
+            return [Document(page_content=self._texts[top[i]], metadata=self._row(top[i])) for i in picked]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, expr: Optional[str] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k, expr)
+
+    def similarity_search(
+        self, query: str, k: int = 4, expr: Optional[str] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, expr)]
+
+    def get_pks(self, expr: str, **kwargs: Any) -> List[int]:
+        with self._lock:
+            return [int(i) for i in self._ids[self._mask(expr)]]
+
+    def search_by_metadata(self, expr: str, fields: Optional[List[str]] = None, limit: int = 10) -> List[Document]:
+        """Filter-only query, mirroring langchain_milvus.Milvus.search_by_metadata."""
+        with self._lock:
+            rows = np.flatnonzero(self._mask(expr))[:limit]
+            return [Document(page_content=self._texts[i], metadata=self._row(i, fields)) for i in rows]
+
+    def schema(self) -> List[dict]:
+        """Field listing in the same shape as the /schema endpoint's Milvus output."""
+        dims = self._vectors.shape[1] if self._vectors is not None and len(self._vectors) else 0
+        fields = [
+            {"name": "pk", "type": "INT64", "is_primary": True, "description": ""},
+            {"name": "text", "type": "VARCHAR", "is_primary": False, "description": ""},
+            {"name": "vector", "type": f"FLOAT_VECTOR({dims}, {self.dtype.name})", "is_primary": False, "description": ""},
+        ]
+        fields.extend(
+            {"name": name, "type": "DYNAMIC", "is_primary": False, "description": ""} for name in self._columns
+        )
+        return fields
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        collection_name: str = "local",
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(embedding_function=embedding, collection_name=collection_name, **kwargs)
+        store.add_texts(texts, metadatas)
+        return store
@@ -0,0 +1,39 @@
+
+import json
+import logging
+import time
+
+from app.core.config import Config
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, for log collectors that parse fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+def configure_logging(level: str = None, fmt: str = None):
+    """
+    Sets up the `app` logger hierarchy (every module logs to
+    logging.getLogger(__name__)). Records below the level are discarded
+    before their %-style arguments are formatted. Other loggers, such as
+    uvicorn's, keep their own configuration.
+    """
+    logger = logging.getLogger("app")
+    logger.setLevel(level or Config.LOG_LEVEL)
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if (fmt or Config.LOG_FORMAT) == "json" else logging.Formatter(TEXT_FORMAT))
+    logger.handlers = [handler]
+    logger.propagate = False
+    return logger
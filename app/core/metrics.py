@@ -0,0 +1,254 @@
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """
+    Current value. A gauge built with `function` is read at scrape time
+    instead (e.g. queue depths that other components already track).
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+        self.function = function
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self):
+        if self.function is not None:
+            try:
+                return [f"{self.name} {_format_value(self.function())}"]
+            except Exception:
+                return []
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with sum and count, per label combination."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the elapsed seconds of its block."""
+        return _Timer(self, labels)
+
+    def _samples(self):
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics, rendered in the Prometheus text exposition format
+    (version 0.0.4) by GET /metrics.
+    """
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self.prefix + name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), function=None) -> Gauge:
+        return self._register(Gauge(self.prefix + name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+class TimedEmbeddings(Embeddings):
+    """Records the latency of every call to the underlying embedding provider."""
+
+    def __init__(self, underlying: Embeddings):
+        self.underlying = underlying
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        EMBEDDING_TEXTS.observe(len(texts))
+        with EMBEDDING_SECONDS.time(operation="documents"):
+            return self.underlying.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        EMBEDDING_TEXTS.observe(1)
+        with EMBEDDING_SECONDS.time(operation="query"):
+            return self.underlying.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        EMBEDDING_TEXTS.observe(len(texts))
+        with EMBEDDING_SECONDS.time(operation="documents"):
+            return await self.underlying.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        EMBEDDING_TEXTS.observe(1)
+        with EMBEDDING_SECONDS.time(operation="query"):
+            return await self.underlying.aembed_query(text)
+
+
+# Global instance
+metrics = MetricsRegistry(prefix="ragume_")
+
+EMBEDDING_SECONDS = metrics.histogram(
+    "embedding_seconds", "Embedding provider call latency", ["operation"]
+)
+EMBEDDING_TEXTS = metrics.histogram(
+    "embedding_batch_texts", "Texts per embedding provider call", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+VECTOR_STORE_SECONDS = metrics.histogram(
+    "vector_store_seconds", "Vector store (Milvus) call latency on the executor", ["operation"]
+)
+ANSWER_CACHE_REQUESTS = metrics.counter(
+    "answer_cache_requests_total", "Answer cache lookups", ["tier", "result"]
+)
+ANSWER_CACHE_SECONDS = metrics.histogram(
+    "answer_cache_lookup_seconds", "Answer cache lookup latency", ["tier"]
+)
+RETRIEVAL_DOCUMENTS = metrics.histogram(
+    "retrieval_documents", "Documents returned per retrieval stage", ["stage"], buckets=(0, 1, 2, 4, 6, 8, 12, 16, 24, 32)
+)
+RETRIEVAL_SCORE = metrics.histogram(
+    "retrieval_score", "Dense retrieval scores of returned chunks (backend metric)",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 1.5, 2.0)
+)
+LLM_FIRST_TOKEN_SECONDS = metrics.histogram(
+    "llm_time_to_first_token_seconds", "Time from the start of generation to the first LLM token"
+)
+LLM_TOKENS_PER_SECOND = metrics.histogram(
+    "llm_tokens_per_second", "LLM output tokens per second after the first token",
+    buckets=(5, 10, 20, 30, 40, 60, 80, 100, 150, 200, 400)
+)
+AGENT_SECONDS = metrics.histogram(
+    "agent_request_seconds", "End-to-end /agent latency until the stream finished", ["cache", "outcome"]
+)
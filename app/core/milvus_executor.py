@@ -0,0 +1,115 @@
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import Config
+from app.core.metrics import VECTOR_STORE_SECONDS, metrics
+
+
+def _operation(fn) -> str:
+    """Metric label for a call: the function name, 'other' for lambdas."""
+    name = getattr(fn, "__name__", "")
+    return name.lstrip("_") if name and name != "<lambda>" else "other"
+
+
+class MilvusExecutor:
+    """
+    Runs blocking pymilvus / langchain_milvus calls on a bounded thread pool.
+
+    Every Milvus call site awaits `run(...)` instead of calling the client
+    directly, so a slow round-trip only occupies a pool thread and never the
+    event loop that serves the other token streams.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="milvus"
+                )
+            return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs `fn(*args, **kwargs)` on the pool and awaits its result."""
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+
+        def call():
+            started = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.total_wait_ms += (started - submitted) * 1000
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                elapsed = time.perf_counter() - started
+                VECTOR_STORE_SECONDS.observe(elapsed, operation=_operation(fn))
+                with self._lock:
+                    self.running -= 1
+                    self.total_run_ms += elapsed * 1000
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        future = self._get_executor().submit(call)
+        try:
+            return await asyncio.wrap_future(future, loop=loop)
+        except asyncio.CancelledError:
+            # A call cancelled before a thread picked it up never runs
+            if future.cancel():
+                with self._lock:
+                    self.queued -= 1
+            raise
+
+    def stats(self):
+        """Queue depth and latency counters."""
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "pool_size": self.max_workers,
+                "queue_depth": self.queued,
+                "running": self.running,
+                "max_queue_depth": self.max_queue_depth,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_ms": round(self.total_wait_ms / finished, 2) if finished else 0.0,
+                "avg_run_ms": round(self.total_run_ms / finished, 2) if finished else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+# Global instance
+milvus_executor = MilvusExecutor(Config.MILVUS_POOL_SIZE)
+
+metrics.gauge(
+    "vector_store_queue_depth", "Vector store calls waiting for an executor thread",
+    function=lambda: milvus_executor.queued
+)
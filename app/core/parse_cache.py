@@ -0,0 +1,233 @@
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ParseCache:
+    """
+    Persistent cache of extracted PDF page text, so unchanged files skip pypdf.
+
+    Two SQLite tables: `files` maps (path, size, mtime) to the file's sha256,
+    letting a file whose stat is unchanged skip re-hashing too; `pages` holds
+    the text and metadata of every page keyed by (sha256, page), so the same
+    content under another path is reused. A document counts as cached only
+    once all its pages were written. `ingested` records the sha256 each
+    source was last ingested at, since chunks kept across an edit still carry
+    the hash of the version that first inserted them.
+    """
+
+    def __init__(self, path: str = None, max_documents: int = 500):
+        self.max_documents = max_documents
+        self._lock = threading.Lock()
+        self._db = None
+        self.hash_reuses = 0
+        self.reused_documents = 0
+        self.reused_pages = 0
+        self.parsed_pages = 0
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.executescript(
+                    "CREATE TABLE IF NOT EXISTS files ("
+                    "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL);"
+                    "CREATE TABLE IF NOT EXISTS documents ("
+                    "sha256 TEXT PRIMARY KEY, pages INTEGER NOT NULL, parsed_at REAL NOT NULL);"
+                    "CREATE TABLE IF NOT EXISTS pages ("
+                    "sha256 TEXT NOT NULL, page INTEGER NOT NULL, text TEXT NOT NULL, metadata TEXT NOT NULL, "
+                    "PRIMARY KEY (sha256, page));"
+                    "CREATE TABLE IF NOT EXISTS ingested ("
+                    "source TEXT PRIMARY KEY, sha256 TEXT NOT NULL, ingested_at REAL NOT NULL);"
+                )
+                self._db.commit()
+            except Exception as e:
+                logger.warning("Parse cache disabled: %s", e)
+                self._db = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    def file_hash(self, path: str, compute: Callable[[str], str]) -> str:
+        """
+        Returns the sha256 of `path`, reusing the stored one when size and
+        mtime are unchanged. Blocking.
+        """
+        stat = os.stat(path)
+        if self._db is not None:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT sha256 FROM files WHERE path = ? AND size = ? AND mtime_ns = ?",
+                    (path, stat.st_size, stat.st_mtime_ns)
+                ).fetchone()
+            if row:
+                self.hash_reuses += 1
+                return row[0]
+
+        digest = compute(path)
+        if self._db is not None:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                    (path, stat.st_size, stat.st_mtime_ns, digest)
+                )
+                self._db.commit()
+        return digest
+
+    def get_pages(self, sha256: str, source: str) -> Optional[List[Document]]:
+        """Cached pages of a document, with `source` set to the given path. Blocking."""
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT pages FROM documents WHERE sha256 = ?", (sha256,)).fetchone()
+            if row is None:
+                return None
+            rows = self._db.execute(
+                "SELECT text, metadata FROM pages WHERE sha256 = ? ORDER BY page", (sha256,)
+            ).fetchall()
+        if len(rows) != row[0]:
+            return None
+
+        docs = []
+        for text, metadata in rows:
+            metadata = json.loads(metadata)
+            metadata["source"] = source
+            docs.append(Document(page_content=text, metadata=metadata))
+        self.reused_documents += 1
+        self.reused_pages += len(docs)
+        return docs
+
+    def ingested_hash(self, source: str) -> Optional[str]:
+        """The sha256 `source` was last fully ingested at, if recorded. Blocking."""
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT sha256 FROM ingested WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def record_ingested(self, sources: Dict[str, Optional[str]]):
+        """Records (or, for a None hash, forgets) the sha256 sources were ingested at. Blocking."""
+        if self._db is None or not sources:
+            return
+        try:
+            with self._lock:
+                now = time.time()
+                for source, sha256 in sources.items():
+                    if sha256 is None:
+                        self._db.execute("DELETE FROM ingested WHERE source = ?", (source,))
+                    else:
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO ingested (source, sha256, ingested_at) VALUES (?, ?, ?)",
+                            (source, sha256, now)
+                        )
+                self._db.commit()
+        except Exception as e:
+            logger.warning("Parse cache write failed: %s", e)
+
+    def page_count(self, sha256: str) -> Optional[int]:
+        """Number of pages of a fully cached document, or None when it is not cached. Blocking."""
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT pages FROM documents WHERE sha256 = ?", (sha256,)).fetchone()
+            if row is None:
+                return None
+            stored = self._db.execute("SELECT COUNT(*) FROM pages WHERE sha256 = ?", (sha256,)).fetchone()
+        if stored[0] != row[0]:
+            return None
+        self.reused_documents += 1
+        return row[0]
+
+    def get_page(self, sha256: str, page: int, source: str) -> Document:
+        """
+        One cached page, with `source` set to the given path. Blocking.
+
+        Raises:
+            KeyError: If the page is not cached
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT text, metadata FROM pages WHERE sha256 = ? AND page = ?", (sha256, page)
+            ).fetchone() if self._db is not None else None
+        if row is None:
+            raise KeyError(f"Page {page} of {sha256} is not in the parse cache")
+        metadata = json.loads(row[1])
+        metadata["source"] = source
+        self.reused_pages += 1
+        return Document(page_content=row[0], metadata=metadata)
+
+    def put_pages(self, sha256: str, docs: List[Document], first_page: int = 0):
+        """Stores parsed pages (numbered from `first_page`). Blocking."""
+        self.parsed_pages += len(docs)
+        if self._db is None or not docs:
+            return
+        try:
+            with self._lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO pages (sha256, page, text, metadata) VALUES (?, ?, ?, ?)",
+                    [
+                        (sha256, first_page + i, doc.page_content, json.dumps(doc.metadata, default=str))
+                        for i, doc in enumerate(docs)
+                    ]
+                )
+                self._db.commit()
+        except Exception as e:
+            logger.warning("Parse cache write failed: %s", e)
+
+    def complete(self, sha256: str, pages: int):
+        """Marks a document's pages as fully stored and evicts the oldest documents. Blocking."""
+        if self._db is None:
+            return
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO documents (sha256, pages, parsed_at) VALUES (?, ?, ?)",
+                    (sha256, pages, time.time())
+                )
+                stale = self._db.execute(
+                    "SELECT sha256 FROM documents ORDER BY parsed_at DESC LIMIT -1 OFFSET ?",
+                    (self.max_documents,)
+                ).fetchall()
+                for (old,) in stale:
+                    self._db.execute("DELETE FROM documents WHERE sha256 = ?", (old,))
+                    self._db.execute("DELETE FROM pages WHERE sha256 = ?", (old,))
+                self._db.commit()
+        except Exception as e:
+            logger.warning("Parse cache write failed: %s", e)
+
+    def stats(self):
+        """Reused vs re-parsed page counters."""
+        total = self.reused_pages + self.parsed_pages
+        return {
+            "enabled": self.enabled,
+            "hash_reuses": self.hash_reuses,
+            "reused_documents": self.reused_documents,
+            "reused_pages": self.reused_pages,
+            "parsed_pages": self.parsed_pages,
+            "reuse_ratio": round(self.reused_pages / total, 4) if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Global instance
+parse_cache = ParseCache(
+    os.path.join(Config.CACHE_DIR, "parse_cache.sqlite3") if Config.PARSE_CACHE_ENABLED else None,
+    max_documents=Config.PARSE_CACHE_MAX_DOCUMENTS,
+)
@@ -0,0 +1,122 @@
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+from app.core.config import Config
+from app.core.corpus import corpus_state
+from app.core.task_queue import task_queue
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "Summarize the professional profile of this candidate in 3-4 concise sentences, "
+    "highlighting key skills and roles. Write it in the first person (e.g., 'I am a...')."
+)
+
+
+class ProfileSummary:
+    """
+    The /summary text, generated once per corpus version.
+
+    The latest summary is held in memory and persisted as JSON in CACHE_DIR,
+    stamped with the corpus version it was built from. When an ingest bumps
+    the version, a regeneration is queued in the background; until it lands
+    the previous summary keeps being served.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.summary = None
+        self.corpus_version = None
+        self.generated_at = 0
+        self.generations = 0
+        self.failures = 0
+        self._lock = None
+        self._load()
+        corpus_state.on_change(self._on_corpus_change)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.summary = data.get("summary")
+            self.corpus_version = data.get("corpus_version")
+            self.generated_at = data.get("generated_at", 0)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Could not read profile summary: %s", e)
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "summary": self.summary,
+                    "corpus_version": self.corpus_version,
+                    "generated_at": self.generated_at,
+                }, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning("Could not persist profile summary: %s", e)
+
+    @property
+    def is_current(self) -> bool:
+        return self.summary is not None and self.corpus_version == corpus_state.version
+
+    @property
+    def etag(self) -> str:
+        digest = hashlib.sha256(f"{self.corpus_version}:{self.summary}".encode("utf-8")).hexdigest()
+        return f'"{digest[:16]}"'
+
+    def _on_corpus_change(self, version: str):
+        task_queue.enqueue("profile_summary.refresh", self.refresh)
+
+    async def _generate(self) -> str:
+        from app.graph.workflow import app_graph
+
+        initial_state = {"question": SUMMARY_PROMPT, "context": [], "answer": ""}
+        final_state = await app_graph.ainvoke(initial_state)
+        return final_state["answer"]
+
+    async def refresh(self):
+        """
+        Generates the summary for the current corpus version unless it already
+        exists. Concurrent callers share one generation.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.is_current:
+                return
+            version = corpus_state.version
+            started = time.perf_counter()
+            try:
+                summary = await self._generate()
+            except Exception:
+                self.failures += 1
+                raise
+            self.summary = summary
+            self.corpus_version = version
+            self.generated_at = int(time.time())
+            self.generations += 1
+            await asyncio.to_thread(self._save)
+            logger.info("Profile summary generated for corpus %s in %.2fs", version, time.perf_counter() - started)
+
+    def stats(self):
+        return {
+            "corpus_version": self.corpus_version,
+            "current": self.is_current,
+            "generated_at": self.generated_at,
+            "generations": self.generations,
+            "failures": self.failures,
+        }
+
+
+# Global instance
+profile_summary = ProfileSummary(os.path.join(Config.CACHE_DIR, "profile_summary.json"))
@@ -0,0 +1,156 @@
+
+import asyncio
+import logging
+import threading
+import time
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.core.config import Config
+from app.core.lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def lexical_scores(query: str, docs: List[Document], k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """
+    BM25 scores of `docs` for `query` in one vectorized pass, with IDF taken
+    over the candidate set itself.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms or not docs:
+        return np.zeros(len(docs), dtype=np.float32)
+    column = {term: j for j, term in enumerate(terms)}
+    tf = np.zeros((len(docs), len(terms)), dtype=np.float32)
+    lengths = np.zeros(len(docs), dtype=np.float32)
+    for i, doc in enumerate(docs):
+        tokens = tokenize(doc.page_content)
+        lengths[i] = len(tokens)
+        for token in tokens:
+            j = column.get(token)
+            if j is not None:
+                tf[i, j] += 1
+
+    n = len(docs)
+    df = (tf > 0).sum(axis=0)
+    idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+    norm = k1 * (1 - b + b * lengths / max(lengths.mean(), 1.0))
+    return ((tf * (k1 + 1)) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+
+def _minmax(scores: np.ndarray) -> np.ndarray:
+    spread = scores.max() - scores.min()
+    if spread <= 0:
+        return np.zeros_like(scores)
+    return (scores - scores.min()) / spread
+
+
+class Reranker:
+    """
+    Reorders over-fetched retrieval candidates before generation.
+
+    The first pass is a vectorized lexical scorer blended with the retrieval
+    rank (`prior_weight`), which costs microseconds. With mode
+    'cross-encoder', a local sentence-transformers cross-encoder then scores
+    all (question, chunk) pairs in one batch, unless the lexical pass is
+    already decisive: its score gap between the last kept and the first
+    dropped candidate is at least `skip_margin`.
+    """
+
+    def __init__(self, mode: str, model_name: str, prior_weight: float, skip_margin: float):
+        self.mode = mode
+        self.model_name = model_name
+        self.prior_weight = prior_weight
+        self.skip_margin = skip_margin
+        self._model = None
+        self._model_failed = False
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.skipped = 0
+        self.model_calls = 0
+        self.total_ms = 0.0
+        self.total_model_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("lexical", "cross-encoder")
+
+    def _cross_encoder(self):
+        """Loads the cross-encoder once; None if sentence-transformers is unavailable."""
+        with self._lock:
+            if self._model is None and not self._model_failed:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+                except Exception as e:
+                    logger.warning("Cross-encoder unavailable, reranking lexically: %s", e)
+                    self._model_failed = True
+            return self._model
+
+    def _model_scores(self, question: str, docs: List[Document]):
+        model = self._cross_encoder()
+        if model is None:
+            return None
+        pairs = [(question, doc.page_content) for doc in docs]
+        return np.asarray(model.predict(pairs, batch_size=len(pairs)), dtype=np.float32)
+
+    async def rerank(self, question: str, docs: List[Document], top_n: int) -> Tuple[List[Document], dict]:
+        """
+        Args:
+            question: User question
+            docs: Candidates in retrieval order
+            top_n: Number of documents to keep
+
+        Returns:
+            (kept documents best first, info with latency and whether the pass was skipped)
+        """
+        started = time.perf_counter()
+        self.calls += 1
+        if len(docs) <= top_n:
+            self.skipped += 1
+            return docs, {"skipped": "too_few_candidates", "rerank_ms": 0.0}
+
+        prior = 1.0 - np.arange(len(docs), dtype=np.float32) / len(docs)
+        scores = (1 - self.prior_weight) * _minmax(lexical_scores(question, docs)) + self.prior_weight * prior
+        order = np.argsort(-scores, kind="stable")
+        info = {"skipped": None, "model": "lexical"}
+
+        if self.mode == "cross-encoder":
+            margin = float(scores[order[top_n - 1]] - scores[order[top_n]])
+            if margin >= self.skip_margin:
+                self.skipped += 1
+                info["skipped"] = "decisive"
+            else:
+                model_started = time.perf_counter()
+                model_scores = await asyncio.to_thread(self._model_scores, question, docs)
+                if model_scores is not None:
+                    order = np.argsort(-model_scores, kind="stable")
+                    info["model"] = self.model_name
+                    self.model_calls += 1
+                    self.total_model_ms += (time.perf_counter() - model_started) * 1000
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.total_ms += elapsed_ms
+        info["rerank_ms"] = round(elapsed_ms, 3)
+        return [docs[i] for i in order[:top_n]], info
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "calls": self.calls,
+            "skipped": self.skipped,
+            "model_calls": self.model_calls,
+            "avg_rerank_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "avg_model_ms": round(self.total_model_ms / self.model_calls, 3) if self.model_calls else 0.0,
+        }
+
+
+# Global instance
+reranker = Reranker(
+    mode=Config.RERANK_MODE,
+    model_name=Config.RERANK_MODEL,
+    prior_weight=Config.RERANK_PRIOR_WEIGHT,
+    skip_margin=Config.RERANK_SKIP_MARGIN,
+)
@@ -1,6 +1,8 @@
+import asyncio
+import logging
 import time
+from collections import OrderedDict
 from pymilvus import (
-    connections,
     utility,
     FieldSchema,
     CollectionSchema,
@@ -8,29 +10,133 @@ from pymilvus import (
     Collection,
 )
 from app.core.config import Config
-from app.core.factory import get_embeddings
+from app.core.factory import clients, get_embeddings
+from app.core.milvus_executor import milvus_executor
+from app.core.corpus import corpus_state
+from app.core.local_vector_store import LocalVectorStore
+from app.core.metrics import ANSWER_CACHE_REQUESTS, ANSWER_CACHE_SECONDS
+from app.core.utils import normalize_question
+
+logger = logging.getLogger(__name__)
+
+class TierStats:
+    """Hit/miss and latency counters for one cache tier."""
+
+    def __init__(self, tier: str):
+        self.tier = tier
+        self.hits = 0
+        self.misses = 0
+        self.total_ms = 0.0
+
+    def record(self, hit: bool, started: float):
+        elapsed = time.perf_counter() - started
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.total_ms += elapsed * 1000
+        ANSWER_CACHE_REQUESTS.inc(tier=self.tier, result="hit" if hit else "miss")
+        ANSWER_CACHE_SECONDS.observe(elapsed, tier=self.tier)
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "avg_latency_ms": round(self.total_ms / lookups, 3) if lookups else 0.0,
+        }
+
+class ExactMatchCache:
+    """
+    In-process L1 answer cache keyed on the normalized question text.
+    Size-bounded LRU with a per-entry TTL; no embedding or network call.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+
+    def get(self, question: str):
+        key = normalize_question(question)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        answer, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return answer
+
+    def put(self, question: str, answer: str):
+        key = normalize_question(question)
+        self._entries[key] = (answer, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
 
 class SemanticCache:
+    """
+    Two-tier answer cache: an exact-match L1 in process memory in front of
+    the Milvus semantic (vector similarity) L2.
+
+    L2 entries are stamped with the corpus version they were generated from
+    and their insert time; searches only match the current version and a
+    periodic sweeper deletes expired or superseded entries in batches.
+    """
+
     def __init__(self, collection_name="semantic_cache", threshold=0.75):
         self.collection_name = collection_name
         self.threshold = threshold
         self.dims = 1536 # OpenAI text-embedding-3-small dimension
-        self._ensure_connection()
-        self.collection = self._get_or_create_collection()
+        self._collection = None
+        self.l1 = ExactMatchCache(Config.ANSWER_CACHE_L1_SIZE, Config.ANSWER_CACHE_L1_TTL_SECONDS)
+        self.l1_stats = TierStats("l1")
+        self.l2_stats = TierStats("l2")
+        self.swept = 0
+        self._sweeper = None
+        corpus_state.on_change(self._on_corpus_change)
+
+    @property
+    def collection(self):
+        """
+        Collection handle, created on first use (or at app startup). With the
+        local backend this is the in-process LocalVectorStore instead.
+        """
+        if self._collection is None:
+            if Config.VECTOR_BACKEND == "local":
+                self._collection = clients.vector_store(self.collection_name)
+            else:
+                self._ensure_connection()
+                self._collection = self._get_or_create_collection()
+        return self._collection
+
+    def load(self):
+        """Opens and loads the cache collection ahead of the first request."""
+        return self.collection
 
     def _ensure_connection(self):
-        if not connections.has_connection("default"):
-            connections.connect(
-                alias="default", 
-                uri=Config.MILVUS_URI, 
-                token=Config.MILVUS_TOKEN
-            )
+        clients.milvus_connection("default")
 
     def _get_or_create_collection(self):
         if utility.has_collection(self.collection_name):
             collection = Collection(self.collection_name)
-            collection.load()
-            return collection
+            field_names = {field.name for field in collection.schema.fields}
+            if {"corpus_version", "created_at"} <= field_names:
+                collection.load()
+                return collection
+            # Entries from before versioning can't be validated; the cache is
+            # disposable, so rebuild it with the current schema.
+            logger.info("Recreating %s with versioned schema", self.collection_name)
+            utility.drop_collection(self.collection_name)
 
         # Define Schema
         fields = [
@@ -38,6 +144,8 @@ class SemanticCache:
             FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=self.dims),
             FieldSchema(name="question", dtype=DataType.VARCHAR, max_length=1000),
             FieldSchema(name="answer", dtype=DataType.VARCHAR, max_length=65535),
+            FieldSchema(name="corpus_version", dtype=DataType.VARCHAR, max_length=64),
+            FieldSchema(name="created_at", dtype=DataType.INT64),
         ]
         schema = CollectionSchema(fields, "Semantic cache for RAG responses")
         
@@ -53,76 +161,211 @@ class SemanticCache:
         collection.load()
         return collection
 
-    async def search(self, question: str):
-        """Returns cached answer if similarity > threshold."""
-        try:
-            embeddings_model = get_embeddings()
-            vector = await embeddings_model.aembed_query(question)
-            
-            search_params = {
-                "metric_type": "COSINE", 
-                "params": {"radius": self.threshold} # Range search if supported or manual filter
-            }
-            
-            # Basic search
-            results = self.collection.search(
-                data=[vector], 
-                anns_field="vector", 
-                param={"metric_type": "COSINE", "params": {"nprobe": 10}},
-                limit=1,
-                output_fields=["answer", "question"]
+    def _search(self, vector, version):
+        """
+        Blocking top-1 search within a corpus version; run on the Milvus executor.
+
+        Returns:
+            (score, question, answer) of the best match, or None
+        """
+        expr = f'corpus_version == "{version}"'
+        collection = self.collection
+        if isinstance(collection, LocalVectorStore):
+            matches = collection.similarity_search_with_score_by_vector(vector, k=1, expr=expr)
+            if not matches:
+                return None
+            doc, score = matches[0]
+            return score, doc.page_content, doc.metadata.get("answer")
+
+        results = collection.search(
+            data=[vector], 
+            anns_field="vector", 
+            param={"metric_type": "COSINE", "params": {"nprobe": 10}},
+            limit=1,
+            expr=expr,
+            output_fields=["answer", "question"]
+        )
+        if not results or not results[0]:
+            return None
+        match = results[0][0]
+        return match.score, match.entity.get("question"), match.entity.get("answer")
+
+    def _insert(self, vector, question, answer, version):
+        """Blocking insert; run on the Milvus executor."""
+        created_at = int(time.time())
+        collection = self.collection
+        if isinstance(collection, LocalVectorStore):
+            return collection.add_embeddings(
+                texts=[question],
+                embeddings=[vector],
+                metadatas=[{"answer": answer, "corpus_version": version, "created_at": created_at}]
             )
+
+        # Pymilvus insert expects list of columns.
+        insert_data = [
+            [vector],   # vector column
+            [question], # question column
+            [answer],   # answer column
+            [version],  # corpus_version column
+            [created_at]  # created_at column
+        ]
+        return collection.insert(insert_data)
+
+    def search_exact(self, question: str):
+        """L1 lookup; returns the cached answer for an equivalent question text."""
+        started = time.perf_counter()
+        answer = self.l1.get(question)
+        self.l1_stats.record(answer is not None, started)
+        return answer
+
+    async def search(self, question: str, vector=None):
+        """
+        Returns cached answer if similarity > threshold (L2). Hits are
+        promoted into the L1 tier.
+
+        Args:
+            question: User question
+            vector: Precomputed question embedding (embedded here if omitted)
+        """
+        started = time.perf_counter()
+        answer = None
+        try:
+            if vector is None:
+                vector = await get_embeddings().aembed_query(question)
+
+            match = await milvus_executor.run(self._search, vector, corpus_state.version)
             
-            if results and results[0]:
-                match = results[0][0]
-                # Distance in Milvus with COSINE is 1 - cosine_similarity for some indices, 
-                # or straightforward cosine depending on metric.
-                # Usually matches return a 'score'. For COSINE, higher is better (closer to 1).
-                # Let's verify score.
+            if match:
+                score, matched_question, cached_answer = match
+                # For COSINE, higher is better (closer to 1).
                 
-                # Debug logging
-                print(f"[Cache] Query: '{question[:50]}...'")
-                print(f"[Cache] Best match: '{match.entity.get('question')[:50]}...'")
-                print(f"[Cache] Similarity score: {match.score:.4f} (threshold: {self.threshold})")
+                logger.debug(
+                    "Query: '%.50s...', best match: '%.50s...', similarity %.4f (threshold %s)",
+                    question, matched_question or "", score, self.threshold
+                )
                 
-                if match.score >= self.threshold:
-                    print(f"[Cache] HIT - Returning cached answer")
-                    return match.entity.get("answer")
+                if score >= self.threshold:
+                    logger.debug("HIT - Returning cached answer")
+                    answer = cached_answer
+                    self.l1.put(question, answer)
                 else:
-                    print(f"[Cache] MISS - Score below threshold")
+                    logger.debug("MISS - Score below threshold")
             
-            return None
+            return answer
         except Exception as e:
-            print(f"Cache search failed: {e}")
+            logger.error("Cache search failed: %s", e)
             return None
+        finally:
+            self.l2_stats.record(answer is not None, started)
+
+    async def add(self, question: str, answer: str, vector=None, corpus_version=None):
+        """
+        Adds a question-answer pair to the cache, reusing `vector` when given.
+        Write failures are re-raised so the background task queue can retry them.
+
+        Args:
+            corpus_version: Version the answer was generated from. Answers from
+                a corpus that has since been re-ingested are discarded.
+        """
+        version = corpus_version or corpus_state.version
+        if version != corpus_state.version:
+            logger.info("Skipping write for answer generated from a superseded corpus")
+            return
 
-    async def add(self, question: str, answer: str):
-        """Adds a question-answer pair to the cache."""
+        self.l1.put(question, answer)
         try:
-            embeddings_model = get_embeddings()
-            vector = await embeddings_model.aembed_query(question)
-            
-            data = [
-                [vector], # vector
-                [question], # question
-                [answer]    # answer
-            ]
-            
-            # Insert usually suggests needing column-based format for pymilvus
-            # [ [vector], [question_str], [answer_str] ] ?
-            # Pymilvus insert expects list of columns.
-            
-            insert_data = [
-                [vector],   # vector column
-                [question], # question column
-                [answer]    # answer column
-            ]
+            if vector is None:
+                vector = await get_embeddings().aembed_query(question)
             
-            self.collection.insert(insert_data)
+            await milvus_executor.run(self._insert, vector, question, answer, version)
             # For serverless/cloud, flush might be handled or not needed instantly, 
             # but good to ensure data visibility eventually.
         except Exception as e:
-            print(f"Cache write failed: {e}")
+            logger.error("Cache write failed: %s", e)
+            raise
+
+    def _on_corpus_change(self, version):
+        # L1 entries aren't versioned; drop them all. Stale L2 rows are already
+        # excluded from search and are removed by the next sweep.
+        self.l1.clear()
+
+    def _delete_stale_batch(self, cutoff, version, batch_size):
+        """Blocking: deletes up to `batch_size` expired/superseded rows (only expired ones without a version)."""
+        expr = f"created_at < {cutoff}"
+        if version is not None:
+            expr += f' or corpus_version != "{version}"'
+        collection = self.collection
+        if isinstance(collection, LocalVectorStore):
+            ids = collection.get_pks(expr)[:batch_size]
+            if ids:
+                collection.delete(ids=ids)
+            return len(ids)
+
+        rows = collection.query(
+            expr=expr,
+            output_fields=["id"],
+            limit=batch_size
+        )
+        if not rows:
+            return 0
+        ids = [row["id"] for row in rows]
+        collection.delete(expr=f"id in {ids}")
+        return len(ids)
+
+    async def sweep(self):
+        """
+        Deletes entries older than the TTL or stamped with an old corpus version.
+
+        Returns:
+            Number of entries deleted
+        """
+        cutoff = int(time.time()) - Config.SEMANTIC_CACHE_TTL_SECONDS
+        batch_size = Config.SEMANTIC_CACHE_SWEEP_BATCH
+        # Until the version is loaded or derived from the store, rows of other
+        # versions may be current ones; only the TTL applies
+        version = corpus_state.version if corpus_state.known else None
+        deleted = 0
+        # Bounded so a lagging delete can't keep the loop spinning
+        for _ in range(Config.SEMANTIC_CACHE_SWEEP_MAX_BATCHES):
+            count = await milvus_executor.run(
+                self._delete_stale_batch, cutoff, version, batch_size
+            )
+            deleted += count
+            if count < batch_size:
+                break
+        self.swept += deleted
+        if deleted:
+            logger.info("Swept %d expired/stale entries", deleted)
+        return deleted
+
+    async def _sweep_loop(self, interval):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error("Cache sweep failed: %s", e)
+            await asyncio.sleep(interval)
+
+    def start_sweeper(self):
+        """Starts the periodic expiry sweep on the running event loop."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(
+                self._sweep_loop(Config.SEMANTIC_CACHE_SWEEP_INTERVAL_SECONDS)
+            )
+
+    async def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    def stats(self):
+        """Per-tier hit ratio and latency."""
+        return {
+            "l1": {**self.l1_stats.as_dict(), "entries": len(self.l1)},
+            "l2": {**self.l2_stats.as_dict(), "swept": self.swept},
+            "corpus_version": corpus_state.version,
+        }
 
 # Global instance
 semantic_cache = SemanticCache()
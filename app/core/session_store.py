@@ -0,0 +1,121 @@
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.local_vector_store import mmr_select
+
+
+class HotSession:
+    """
+    One active session's conversation memory, held in process.
+
+    `segments` maps a segment number to its summary text, normalized vector
+    and stored metadata; the highest number is the rolling segment. `pk` is
+    the stored row of that segment and `dirty` marks a summary not yet
+    written to the vector store.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.segments = {}
+        self.current_segment = 0
+        self.segment_messages = 0
+        self.pk = None
+        self.folded = deque(maxlen=64)
+        self.dirty = False
+        self.last_active = time.time()
+        self.lock = asyncio.Lock()
+
+    @property
+    def summary(self) -> str:
+        entry = self.segments.get(self.current_segment)
+        return entry[0] if entry else ""
+
+    def set_segment(self, segment: int, text: str, vector, metadata: dict):
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        self.segments[segment] = (text, vector, metadata)
+
+    def search(self, query, k: int, mmr_fetch_k: int = 0, lambda_mult: float = 0.5) -> List[Tuple[str, dict]]:
+        """Top-k summaries by cosine similarity (MMR-diversified when mmr_fetch_k > 0)."""
+        if not self.segments:
+            return []
+        entries = list(self.segments.values())
+        matrix = np.stack([vector for _, vector, _ in entries])
+        query = np.asarray(query, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        if mmr_fetch_k:
+            top = np.argsort(-(matrix @ query))[:mmr_fetch_k]
+            picked = [top[i] for i in mmr_select(query, matrix[top], k, lambda_mult)]
+        else:
+            picked = np.argsort(-(matrix @ query))[:k]
+        return [(entries[i][0], entries[i][2]) for i in picked]
+
+
+class SessionStore:
+    """
+    Bounded LRU of hot sessions, expired after `ttl_seconds` of inactivity
+    (matching the UI's 24h localStorage session). Sessions evicted with
+    unwritten summaries are handed to `on_evict_dirty` so they are flushed.
+    """
+
+    def __init__(self, max_sessions: int, ttl_seconds: float, on_evict_dirty=None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.on_evict_dirty = on_evict_dirty
+        self._sessions = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evict(self, session: HotSession):
+        self.evictions += 1
+        if session.dirty and self.on_evict_dirty is not None:
+            self.on_evict_dirty(session)
+
+    def get(self, session_id: str) -> Optional[HotSession]:
+        session = self._sessions.get(session_id)
+        if session is not None and time.time() - session.last_active > self.ttl_seconds:
+            del self._sessions[session_id]
+            self._evict(session)
+            session = None
+        if session is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        session.last_active = time.time()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def put(self, session: HotSession) -> HotSession:
+        """Adds a session, keeping one already added concurrently."""
+        existing = self._sessions.get(session.session_id)
+        if existing is not None:
+            return existing
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            _, evicted = self._sessions.popitem(last=False)
+            self._evict(evicted)
+        return session
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def dirty_sessions(self) -> List[HotSession]:
+        return [session for session in self._sessions.values() if session.dirty]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "sessions": len(self._sessions),
+            "capacity": self.max_sessions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "dirty": len(self.dirty_sessions()),
+        }
@@ -0,0 +1,146 @@
+
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Dict, List
+
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class SubscriberOverflow(RuntimeError):
+    """A subscriber fell more than the backlog behind the shared stream."""
+
+
+class Flight:
+    """
+    One in-flight generation fanned out to every subscriber.
+
+    Each subscriber has its own bounded queue, so nothing holds the whole
+    response. Only a leading dict item (the answer's meta) is kept, for
+    subscribers joining before the first text chunk; after that the flight
+    stops accepting new subscribers, since it cannot replay what it sent.
+    """
+
+    def __init__(self, key: str, backlog: int):
+        self.key = key
+        self.backlog = backlog
+        self.header = None
+        self.streaming = False
+        self.subscribers = 0
+        self._queues: List[asyncio.Queue] = []
+
+    @property
+    def joinable(self) -> bool:
+        return not self.streaming
+
+    def publish(self, item) -> int:
+        """Queues an item for every subscriber. Returns how many were cut off for falling behind."""
+        if isinstance(item, dict) and not self.streaming:
+            self.header = item
+        else:
+            self.streaming = True
+        dropped = 0
+        for queue in list(self._queues):
+            if queue.qsize() >= self.backlog:
+                # Cut off the slow subscriber instead of buffering for it
+                self._queues.remove(queue)
+                queue.put_nowait(SubscriberOverflow(f"Fell more than {self.backlog} chunks behind"))
+                dropped += 1
+            else:
+                queue.put_nowait(item)
+        return dropped
+
+    def finish(self, error: Exception = None):
+        for queue in self._queues:
+            # publish keeps one slot free for the end marker
+            queue.put_nowait(error if error is not None else _END)
+        self._queues = []
+
+    def subscribe(self) -> AsyncIterator:
+        # Registered now, not on first iteration, so no item is missed
+        queue = asyncio.Queue(maxsize=self.backlog + 1)
+        if self.header is not None:
+            queue.put_nowait(self.header)
+        self._queues.append(queue)
+        self.subscribers += 1
+        return self._drain(queue)
+
+    async def _drain(self, queue: asyncio.Queue) -> AsyncIterator:
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            if queue in self._queues:
+                self._queues.remove(queue)
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight generations.
+
+    The first caller for a key becomes the leader: its producer runs as a
+    detached task (so it finishes and populates the cache even if the leader's
+    client disconnects). Callers arriving for the same key before the first
+    text chunk subscribe to the leader's stream instead of starting their own
+    embedding, retrieval and LLM call; later ones start a new flight.
+    """
+
+    def __init__(self, backlog: int = 1024):
+        self.backlog = backlog
+        self._flights: Dict[str, Flight] = {}
+        self._tasks = set()
+        self.leaders = 0
+        self.followers = 0
+        self.overflows = 0
+
+    def stream(self, key: str, produce: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """
+        Returns the item stream for `key`, starting `produce()` only if no
+        joinable generation for that key is already running.
+        """
+        flight = self._flights.get(key)
+        if flight is not None and flight.joinable:
+            self.followers += 1
+            logger.debug("Joining in-flight answer for: '%.50s'", key)
+            return flight.subscribe()
+
+        flight = Flight(key, self.backlog)
+        self._flights[key] = flight
+        self.leaders += 1
+        stream = flight.subscribe()
+        task = asyncio.create_task(self._run(flight, produce))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return stream
+
+    async def _run(self, flight: Flight, produce):
+        try:
+            async for item in produce():
+                self.overflows += flight.publish(item)
+            flight.finish()
+        except Exception as e:
+            flight.finish(e)
+        finally:
+            # A newer flight may have taken the key once this one streamed
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+    def stats(self):
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "overflows": self.overflows,
+        }
+
+
+# Global instance
+single_flight = SingleFlight(backlog=Config.SINGLE_FLIGHT_BACKLOG)
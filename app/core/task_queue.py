@@ -0,0 +1,146 @@
+
+import asyncio
+import logging
+import time
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTaskQueue:
+    """
+    Bounded in-process queue for work that must not hold the HTTP response open.
+
+    Jobs are zero-argument callables returning an awaitable (so a failed job can
+    be re-created and retried with exponential backoff). When the queue is full,
+    new jobs are dropped rather than blocking the request. On shutdown the queue
+    is drained for up to `drain_timeout` seconds.
+    """
+
+    def __init__(self, maxsize: int, workers: int, max_retries: int, backoff_seconds: float):
+        self.maxsize = maxsize
+        self.worker_count = workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._queue = None
+        self._workers = []
+        self._accepting = False
+        self.enqueued = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retried = 0
+        self.max_depth = 0
+        self.total_wait_ms = 0.0
+        self.total_latency_ms = 0.0
+
+    def start(self):
+        """Creates the queue and worker tasks on the running event loop."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"task-queue-{i}")
+            for i in range(self.worker_count)
+        ]
+        self._accepting = True
+
+    def enqueue(self, name: str, job) -> bool:
+        """
+        Schedules `job` for background execution.
+
+        Args:
+            name: Label used in logs
+            job: Callable returning an awaitable
+
+        Returns:
+            True if queued, False if the queue is stopped or full (job dropped)
+        """
+        if not self._accepting:
+            self.dropped += 1
+            logger.warning("Not running, dropped job: %s", name)
+            return False
+        try:
+            self._queue.put_nowait((name, job, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Queue full (%d), dropped job: %s", self.maxsize, name)
+            return False
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    async def _worker(self):
+        while True:
+            name, job, enqueued_at = await self._queue.get()
+            started = time.perf_counter()
+            self.total_wait_ms += (started - enqueued_at) * 1000
+            try:
+                await self._run_with_retries(name, job)
+            finally:
+                self.total_latency_ms += (time.perf_counter() - enqueued_at) * 1000
+                self._queue.task_done()
+
+    async def _run_with_retries(self, name, job):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await job()
+                self.completed += 1
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt < self.max_retries:
+                    self.retried += 1
+                    delay = self.backoff_seconds * (2 ** attempt)
+                    logger.warning("%s failed (%s), retrying in %.2fs", name, e, delay)
+                    await asyncio.sleep(delay)
+                else:
+                    self.failed += 1
+                    logger.error("%s failed after %d attempts: %s", name, attempt + 1, e)
+
+    async def drain(self, timeout: float):
+        """Stops accepting jobs, waits for queued ones, then stops the workers."""
+        self._accepting = False
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Drain timed out with %d jobs pending", self._queue.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self):
+        """Queue depth, outcome counters and latency."""
+        finished = self.completed + self.failed
+        return {
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_depth": self.max_depth,
+            "capacity": self.maxsize,
+            "workers": len(self._workers),
+            "enqueued": self.enqueued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "avg_wait_ms": round(self.total_wait_ms / finished, 2) if finished else 0.0,
+            "avg_latency_ms": round(self.total_latency_ms / finished, 2) if finished else 0.0,
+        }
+
+
+# Global instance
+task_queue = BackgroundTaskQueue(
+    maxsize=Config.TASK_QUEUE_MAXSIZE,
+    workers=Config.TASK_QUEUE_WORKERS,
+    max_retries=Config.TASK_QUEUE_MAX_RETRIES,
+    backoff_seconds=Config.TASK_QUEUE_BACKOFF_SECONDS,
+)
+
+metrics.gauge(
+    "task_queue_depth", "Background jobs waiting in the task queue",
+    function=lambda: task_queue._queue.qsize() if task_queue._queue is not None else 0
+)
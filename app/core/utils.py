@@ -0,0 +1,42 @@
+
+import logging
+import re
+import string
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(f"[{re.escape(string.punctuation)}]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_question(text: str) -> str:
+    """
+    Folds case, punctuation and whitespace so trivially different phrasings
+    of the same question ("What are your skills?" / "what are your skills")
+    share one key.
+    """
+    text = _PUNCTUATION.sub(" ", text.casefold())
+    return _WHITESPACE.sub(" ", text).strip()
+
+def quote_expr(value: str) -> str:
+    """Escapes a value for use inside a double-quoted string of a Milvus filter expression."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning("Tokenizer unavailable, estimating token counts: %s", e)
+        return None
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Token count for `model`, estimated at ~4 chars/token when tiktoken is unavailable."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4) if text else 0
+    return len(encoding.encode(text, disallowed_special=()))
@@ -1,44 +1,113 @@
+import logging
+import math
+import time
 
-from langchain_milvus import Milvus
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from app.core import factory
 from app.core.config import Config
 from app.core.factory import get_llm, get_embeddings
+from app.core.lexical_index import lexical_index, reciprocal_rank_fusion
+from app.core.context_packer import pack_context
+from app.core.reranker import reranker
+from app.core.milvus_executor import milvus_executor
+from app.core.metrics import RETRIEVAL_DOCUMENTS, RETRIEVAL_SCORE
 from app.graph.state import State
 
+logger = logging.getLogger(__name__)
+
 def get_vector_store():
-    """Initializes and returns the Milvus vector store connection."""
-    embeddings = get_embeddings()
-    
-    if not Config.MILVUS_URI or not Config.MILVUS_TOKEN:
-        print("Milvus URI/Token not set. Vector store usage will fail.")
-        return None
-
-    vector_store = Milvus(
-        embedding_function=embeddings,
-        connection_args={
-            "uri": Config.MILVUS_URI,
-            "token": Config.MILVUS_TOKEN,
-        },
-        collection_name=Config.COLLECTION_NAME,
-        auto_id=True,
-    )
-    return vector_store
+    """Returns the shared Milvus vector store for the portfolio collection."""
+    return factory.get_vector_store()
+
+async def dense_search(question: str, embedding=None, k: int = 6):
+    """Dense top-k search over the portfolio collection."""
+    vector_store = await milvus_executor.run(get_vector_store)
+    if not vector_store:
+        return []
+
+    # Reuse the request-scoped embedding when the endpoint already computed it
+    if not embedding:
+        embedding = await get_embeddings().aembed_query(question)
+
+    if Config.MMR_ENABLED:
+        docs = await milvus_executor.run(
+            vector_store.max_marginal_relevance_search_by_vector,
+            embedding,
+            k=k,
+            fetch_k=max(Config.MMR_FETCH_K, k),
+            lambda_mult=Config.MMR_LAMBDA
+        )
+    else:
+        results = await milvus_executor.run(vector_store.similarity_search_with_score_by_vector, embedding, k=k)
+        for _, score in results:
+            RETRIEVAL_SCORE.observe(score)
+        docs = [doc for doc, _ in results]
+    RETRIEVAL_DOCUMENTS.observe(len(docs), stage="dense")
+    return docs
+
+def candidate_k():
+    """Candidates to retrieve: over-fetched when a rerank stage will cut them down."""
+    return Config.RERANK_FETCH_K if reranker.enabled else Config.RETRIEVAL_K
+
+async def retrieve_portfolio(question: str, embedding=None, k: int = None):
+    """
+    Retrieves portfolio chunks according to Config.RETRIEVAL_MODE.
+
+    'dense' runs vector search only. 'hybrid' fuses a smaller dense search
+    with BM25 lexical hits (exact technology / company names, dates) using
+    reciprocal rank fusion, and falls back to dense while the lexical index
+    is empty.
+    """
+    k = k or candidate_k()
+    if Config.RETRIEVAL_MODE != "hybrid" or not lexical_index.count():
+        return await dense_search(question, embedding, k=k)
+
+    # Each list grows with k when over-fetching for the reranker
+    scale = k / Config.RETRIEVAL_K
+    dense = await dense_search(question, embedding, k=math.ceil(Config.RETRIEVAL_DENSE_K * scale))
+    lexical = [doc for doc, _ in lexical_index.search(question, k=math.ceil(Config.RETRIEVAL_LEXICAL_K * scale))]
+    fused = reciprocal_rank_fusion([dense, lexical], k=Config.RETRIEVAL_RRF_K, limit=k)
+    RETRIEVAL_DOCUMENTS.observe(len(lexical), stage="lexical")
+    RETRIEVAL_DOCUMENTS.observe(len(fused), stage="fused")
+    return fused
 
 async def retrieve(state: State):
     """Retrieves relevant documents from Milvus."""
-    print(f"Retrieving for: {state['question']}")
-    vector_store = get_vector_store()
-    if not vector_store:
-        return {"context": []}
-        
-    retriever = vector_store.as_retriever(search_kwargs={"k": 6})
-    docs = await retriever.ainvoke(state["question"])
-    return {"context": docs}
+    if state.get("context"):
+        # Already fetched concurrently by the endpoint
+        return {"context": state["context"]}
+
+    logger.debug("Retrieving for: %s", state["question"])
+    started = time.perf_counter()
+    docs = await retrieve_portfolio(state["question"], state.get("question_embedding"))
+    timings = {**(state.get("timings") or {}), "retrieve_ms": round((time.perf_counter() - started) * 1000, 3)}
+    return {"context": docs, "timings": timings}
+
+async def rerank(state: State):
+    """Reorders the over-fetched candidates and keeps the best RETRIEVAL_K."""
+    docs, info = await reranker.rerank(state["question"], state["context"], Config.RETRIEVAL_K)
+    RETRIEVAL_DOCUMENTS.observe(len(docs), stage="reranked")
+    logger.debug("Rerank: %d -> %d docs, %s", len(state["context"]), len(docs), info)
+    timings = {**(state.get("timings") or {}), "rerank_ms": info["rerank_ms"]}
+    return {"context": docs, "timings": timings}
+
+async def pack(state: State):
+    """Dedupes, merges overlapping neighbours and fits the context into the prompt token budget."""
+    context = pack_context(
+        state["context"], Config.CONTEXT_TOKEN_BUDGET, Config.OPENAI_LLM_MODEL,
+        dedup_threshold=Config.CONTEXT_DEDUP_THRESHOLD
+    )
+    conversation_context = pack_context(
+        state.get("conversation_context", []), Config.CONVERSATION_TOKEN_BUDGET, Config.OPENAI_LLM_MODEL,
+        dedup_threshold=Config.CONTEXT_DEDUP_THRESHOLD, merge=False
+    )
+    return {"context": context, "conversation_context": conversation_context}
 
 async def generate(state: State):
     """Generates an answer using the LLM, retrieved context, and conversation history."""
-    print("Generating answer...")
+    logger.debug("Generating answer...")
+    started = time.perf_counter()
     llm = get_llm()
     
     template = """You are a professional, friendly, and helpful AI assistant representing the portfolio owner.
@@ -79,9 +148,7 @@ Current Question: {question}
         {
             "context": lambda x: format_docs(state["context"]),
             "question": lambda x: state["question"],
-            "conversation_context_section": lambda x: format_conversation_context(
-                state.get("conversation_context", [])
-            )
+            "conversation_context_section": lambda x: format_conversation_context(state.get("conversation_context", []))
         }
         | prompt
         | llm
@@ -89,4 +156,5 @@ Current Question: {question}
     )
     
     response = await chain.ainvoke(state)
-    return {"answer": response}
+    timings = {**(state.get("timings") or {}), "generate_ms": round((time.perf_counter() - started) * 1000, 3)}
+    return {"answer": response, "timings": timings}
@@ -6,11 +6,15 @@ class State(TypedDict):
     """
     State for the RAG agent.
     - question: The user's input question.
-    - context: Retrieved context from Milvus (portfolio data).
+    - context: Retrieved context from Milvus (portfolio data); reranked and
+      packed into the prompt budget before generate.
     - answer: Generated answer.
     - session_id: Unique session identifier for conversation tracking.
     - conversation_context: Retrieved conversation summaries from Milvus.
     - recent_messages: Last few messages for immediate context and summarization.
+    - question_embedding: Embedding of the question, computed once per request and
+      shared by the semantic cache, conversation memory and retrieval.
+    - timings: Per-stage latencies in ms (retrieve_ms, rerank_ms).
     """
     question: str
     context: List[Document]
@@ -18,3 +22,5 @@ class State(TypedDict):
     session_id: str
     conversation_context: List[Document]
     recent_messages: List[Dict[str, str]]
+    question_embedding: List[float]
+    timings: Dict[str, float]
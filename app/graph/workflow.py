@@ -1,15 +1,25 @@
 
 from langgraph.graph import StateGraph, START, END
 from app.graph.state import State
-from app.graph.nodes import retrieve, generate
+from app.graph.nodes import retrieve, rerank, pack, generate
+from app.core.reranker import reranker
 
 workflow = StateGraph(State)
 
 workflow.add_node("retrieve", retrieve)
+workflow.add_node("pack", pack)
 workflow.add_node("generate", generate)
 
 workflow.add_edge(START, "retrieve")
-workflow.add_edge("retrieve", "generate")
+if reranker.enabled:
+    # retrieve over-fetches (RERANK_FETCH_K); rerank keeps RETRIEVAL_K
+    workflow.add_node("rerank", rerank)
+    workflow.add_edge("retrieve", "rerank")
+    workflow.add_edge("rerank", "pack")
+else:
+    workflow.add_edge("retrieve", "pack")
+# pack fits the final context into the prompt budget; it is what generate sees
+workflow.add_edge("pack", "generate")
 workflow.add_edge("generate", END)
 
 app_graph = workflow.compile()
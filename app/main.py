@@ -1,16 +1,65 @@
 
+import logging
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
+from app.core.logging_config import configure_logging
+
+# Before the app modules load, so their import-time messages are handled too
+configure_logging()
+
 from app.api.endpoints import router as api_router
 from app.core.config import Config
 from app.core.limiter import limiter
+from app.core.factory import clients
+from app.core.semantic_cache import semantic_cache
+from app.core.milvus_executor import milvus_executor
+from app.core.task_queue import task_queue
+from app.core.ingestion import ingestion_pipeline, restore_lexical_index, sync_corpus_version
+from app.core.ingestion_jobs import ingestion_jobs
+from app.core.parse_cache import parse_cache
+from app.core.lexical_index import lexical_index
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.core.conversation_memory import conversation_memory
+
+    # Create the shared LLM / embedding / Milvus clients once per process
+    try:
+        await milvus_executor.run(clients.startup)
+        await milvus_executor.run(semantic_cache.load)
+    except Exception as e:
+        logger.warning("Client warm-up failed: %s", e)
+    # Re-derive the corpus version from the store (CACHE_DIR may be fresh)
+    # before the sweeper compares cached answers against it
+    await sync_corpus_version()
+    await restore_lexical_index()
+    task_queue.start()
+    semantic_cache.start_sweeper()
+    conversation_memory.start_compactor()
+    yield
+    await semantic_cache.stop_sweeper()
+    await conversation_memory.stop_compactor()
+    # Cancel running ingest jobs, then let queued cache writes / summaries
+    # finish before closing clients
+    await ingestion_jobs.shutdown()
+    await task_queue.drain(timeout=Config.TASK_QUEUE_DRAIN_TIMEOUT)
+    # Write behind any conversation summaries the queue did not get to
+    await conversation_memory.flush_all()
+    ingestion_pipeline.shutdown()
+    parse_cache.close()
+    lexical_index.persist()
+    milvus_executor.shutdown()
+    await clients.shutdown()
 
-app = FastAPI(title="Portfolio RAG Chatbot")
+app = FastAPI(title="Portfolio RAG Chatbot", lifespan=lifespan)
 
 # Add Limiter to app state
 app.state.limiter = limiter
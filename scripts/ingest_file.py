@@ -1,9 +1,21 @@
 import requests
 import argparse
 import os
+import time
 
 BASE_URL = "http://127.0.0.1:8000"
 
+def wait_for_job(status_url, interval=1.0):
+    """Polls an ingestion job until it finishes and returns its final status."""
+    while True:
+        job = requests.get(status_url).json()
+        done = sum(1 for f in job["files"].values() if f["status"] in ("done", "unchanged", "failed"))
+        print(f"  {job['status']}: {done}/{len(job['files'])} files, "
+              f"{job['chunks_embedded']} chunks embedded ({job['chunks_per_second']} chunks/s)")
+        if job["status"] in ("completed", "failed", "cancelled"):
+            return job
+        time.sleep(interval)
+
 def ingest_file(file_path):
     print(f"--- Ingesting {file_path} ---")
     
@@ -20,10 +32,14 @@ def ingest_file(file_path):
     
     try:
         response = requests.post(f"{BASE_URL}/ingest", json=payload)
-        if response.status_code == 200:
-            print(f"[SUCCESS] {response.json()}")
-        else:
+        if response.status_code != 202:
             print(f"[ERROR] Failed: {response.status_code} - {response.text}")
+            return
+        job = wait_for_job(response.json()["status_url"])
+        if job["status"] == "completed":
+            print(f"[SUCCESS] {job['report']}")
+        else:
+            print(f"[ERROR] Job {job['status']}: {job['error'] or job['errors']}")
     except Exception as e:
         print(f"[ERROR] Connection Error: {e}")
         print("Ensure the server is running on port 8000.")
@@ -7,6 +7,10 @@ sys.path.append('.')
 
 from app.core.semantic_cache import semantic_cache
 from app.core.config import Config
+from app.core.logging_config import configure_logging
+
+# Show the cache's per-query similarity logs
+configure_logging("DEBUG")
 
 async def test_cache():
     print("=" * 60)
@@ -1,7 +1,11 @@
 import requests
 import json
+import time
 
 BASE_URL = "http://127.0.0.1:8000"
+# GET /ingest/{job_id} allows 60 requests per minute
+POLL_INTERVAL_SECONDS = 1
+INGEST_TIMEOUT_SECONDS = 300
 
 def test_endpoints():
     print("--- Testing RAG Endpoints ---")
@@ -21,10 +25,28 @@ def test_endpoints():
     }
     try:
         response = requests.post(f"{BASE_URL}/ingest", json=ingest_payload)
-        if response.status_code == 200:
-            print(f"[SUCCESS] Ingestion Check: {response.json()}")
-        else:
+        if response.status_code != 202:
             print(f"[ERROR] Ingestion Failed: {response.status_code} - {response.text}")
+            return
+        job_id = response.json()["job_id"]
+        print(f"Ingestion job {job_id} accepted, polling...")
+
+        # The job runs in the background; poll until it reaches a terminal state
+        deadline = time.time() + INGEST_TIMEOUT_SECONDS
+        while True:
+            job = requests.get(f"{BASE_URL}/ingest/{job_id}").json()
+            if job["status"] in ("completed", "failed", "cancelled"):
+                break
+            if time.time() > deadline:
+                print(f"[ERROR] Ingestion Timed Out: {job}")
+                return
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+        if job["status"] == "completed":
+            print(f"[SUCCESS] Ingestion Check: {job['report']}")
+        else:
+            print(f"[ERROR] Ingestion {job['status']}: {job.get('error') or job}")
+            return
     except Exception as e:
         print(f"[ERROR] Connection Error during Ingestion: {e}")
         return